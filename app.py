@@ -1,8 +1,11 @@
 from flask import Flask, render_template, request, jsonify, send_from_directory
 from nlp_lib.doc_reader import cleanup_extracted_images as img_cleaner, get_content_sections as gcs
+from nlp_lib.doc_search import search_document
 import os
+import hmac
 import requests
 from nlp_lib.gen_lex import IbaloiTranslator
+from nlp_lib.lexicon_sync import LexiconSync, UpstreamError
 
 # =============================
 # INITIALIZATION
@@ -15,6 +18,19 @@ app = Flask(
 )
 
 translator_service = IbaloiTranslator()
+lexicon_sync = LexiconSync(csv_path=translator_service.csv_path, translator=translator_service)
+# Seconds between background (conditional) syncs with the sheet
+LEXICON_SYNC_MAX_AGE = int(os.environ.get("LEXICON_SYNC_MAX_AGE", 300))
+# Skip the debug reloader's watcher process; its child serves the requests
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    lexicon_sync.start_background_sync(LEXICON_SYNC_MAX_AGE)
+# Shared secret for admin-only endpoints, sent as the X-Admin-Token header.
+# When unset, admin endpoints are disabled.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+def is_admin():
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
 
 # =============================
 # CLIENT PAGE ROUTES
@@ -139,6 +155,38 @@ def get_sections():
     except Exception as e:
         return jsonify({"error": f"An error occurred during processing: {str(e)}"}), 500
 
+# Most results /search-doc returns per request
+SEARCH_MAX_LIMIT = 100
+
+@app.route("/search-doc", methods=["POST"])
+def search_doc():
+    """
+    Full-text search over a document's sections.
+    Expects JSON: { "filepath": "assets/....docx", "query": "words", "limit": 10 }
+    limit is clamped to 1..SEARCH_MAX_LIMIT.
+    Returns ranked section ids (indexes into /read-doc-content's list) with highlighted snippets.
+    """
+    data = request.get_json() or {}
+    filepath = data.get('filepath')
+    query = (data.get('query') or '').strip()
+
+    if not filepath or not query:
+        return jsonify({"error": "Missing filepath or query"}), 400
+
+    try:
+        limit = min(max(int(data.get('limit', 10)), 1), SEARCH_MAX_LIMIT)
+    except (TypeError, ValueError):
+        return jsonify({"error": "'limit' must be an integer"}), 400
+
+    try:
+        results = search_document(filepath, query, root_dir=app.root_path, limit=limit)
+        return jsonify({"query": query, "results": results})
+
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": f"An error occurred during search: {str(e)}"}), 500
+
 # =============================
 # PROXY ROUTE
 # =============================
@@ -197,6 +245,87 @@ def translate_ibaloi():
     except Exception as e:
         return jsonify({"error": str(e), "success": False}), 500
 
+@app.route("/api/translate/approve", methods=["POST"])
+def approve_translation():
+    """
+    Adds an admin-approved translation to the translation memory.
+    Requires the X-Admin-Token header; disabled when ADMIN_TOKEN is not configured.
+    Expects JSON: { "text": "source", "translation": "approved translation", "direction": "ib2en" | "en2ib" }
+    direction is detected from the text when omitted.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not is_admin():
+        return jsonify({"error": "Admin token required", "success": False}), 403
+
+    try:
+        data = request.get_json()
+
+        if not data or not data.get('text') or not data.get('translation'):
+            return jsonify({"error": "Missing 'text' or 'translation' field in JSON payload"}), 400
+
+        direction = data.get('direction') or translator_service.detect_direction(data['text'])
+        if direction not in ('ib2en', 'en2ib'):
+            return jsonify({"error": "'direction' must be 'ib2en' or 'en2ib'"}), 400
+
+        translator_service.translation_memory.approve(data['text'], data['translation'], direction)
+        return jsonify({"success": True, "direction": direction}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e), "success": False}), 500
+
+# =============================
+# LEXICON SYNC ROUTES
+# =============================
+
+@app.route("/api/lexicon", methods=["GET"])
+def lexicon_rows():
+    """
+    Full lexicon as synced from the crowdsourced sheet.
+    Returns JSON: { "version": n, "headers": [...], "rows": [{"key": ..., "row": {...}}] }
+    """
+    version, headers, rows = lexicon_sync.snapshot()
+    return jsonify({
+        "version": version,
+        "headers": headers,
+        "rows": [{"key": key, "row": row} for key, row in rows]
+    })
+
+@app.route("/api/lexicon/changes", methods=["GET"])
+def lexicon_changes():
+    """
+    Row changes after a version, for clients that already hold the lexicon.
+    Query: ?since=<version>
+    """
+    try:
+        since = int(request.args.get("since", 0))
+    except ValueError:
+        return jsonify({"error": "'since' must be an integer version"}), 400
+
+    version, _, _ = lexicon_sync.snapshot()
+    return jsonify({"version": version, "changes": lexicon_sync.changes_since(since)})
+
+@app.route("/api/lexicon/sync", methods=["POST"])
+def lexicon_sync_now():
+    """
+    Forces a sync with the sheet.
+    Requires the X-Admin-Token header; disabled when ADMIN_TOKEN is not configured.
+    Optional JSON: { "new_only": true } to only merge rows flagged isNew,
+    { "force": true } to accept a sync that deletes many rows.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not is_admin():
+        return jsonify({"error": "Admin token required", "success": False}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(lexicon_sync.sync(new_only=bool(data.get("new_only")), force=bool(data.get("force")))), 200
+    except UpstreamError as e:
+        return jsonify({"error": str(e), "success": False}), 502
+    except Exception as e:
+        return jsonify({"error": str(e), "success": False}), 500
+
 ## Main Function
 if __name__ == "__main__":
     app.run(
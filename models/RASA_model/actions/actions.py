@@ -4,11 +4,21 @@ from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 
 #import for the json request
+import os
 import requests
 
+# Overridable so the load tests can point at a local stub
+RAG_URL = os.environ.get("RAG_URL", "http://rag_server:8000/predict")
+
+# Same lexicon as the NLU LexiconEntityExtractor (see config.yml)
+LEXICON_PATH = os.environ.get("LEXICON_PATH", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..',
+    'nlp_lib', 'FINAL-Ibaloi_LexiconWordCollection - Main Lexicon.csv'
+))
+
 # Load the CSV once when the server starts
 # Ensure your CSV headers match the code below
-df = pd.read_csv('ibaloi_lexicon.csv')
+df = pd.read_csv(LEXICON_PATH)
 df.fillna("N/A", inplace=True) # Handle empty fields
 
 class ActionTranslateToIbaloi(Action):
@@ -27,14 +37,14 @@ class ActionTranslateToIbaloi(Action):
             return []
 
         # Search the CSV (Case insensitive search)
-        result = df[df['englishTranslation'].str.contains(query_word, case=False, na=False)]
+        result = df[df['English_word'].str.contains(query_word, case=False, na=False)]
 
         if not result.empty:
             # Get the first match
             row = result.iloc[0]
-            word = row['word']
+            word = row['Ibaloi_word']
             pronunciation = row['Pronunciation']
-            sentence = row['ibaloiSentence']
+            sentence = row['Ibaloi_sentence']
             
             response = f"The Ibaloi word for '{query_word}' is **{word}**."
             
@@ -64,9 +74,8 @@ class ActionRAGCall(Action):
         user_message = tracker.latest_message.get("text", "").strip().lower()
         try:
 
-            rag_url = "http://rag_server:8000/predict"
             response = requests.post(
-                rag_url,
+                RAG_URL,
                 json={"query": user_message, 
                 }
             )
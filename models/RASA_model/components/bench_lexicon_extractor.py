@@ -0,0 +1,128 @@
+"""
+Compares LexiconEntityExtractor against a DIET entity pipeline.
+
+Run from models/RASA_model:
+    python -m components.bench_lexicon_extractor [--lexicon PATH] [--diet]
+
+"Training" for the lexicon extractor is compiling the automaton from the CSV.
+--diet additionally trains the commented-out DIET pipeline from config.yml and
+times Agent.parse_message on the same messages (requires Rasa).
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import tempfile
+import time
+
+import yaml
+
+from components.lexicon_automaton import (
+    DEFAULT_LEXICON_PATH,
+    DEFAULT_STOPWORDS,
+    build_automaton,
+    load_lexicon_terms,
+    select_matches,
+)
+
+ANNOTATION = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+
+DIET_CONFIG = """
+recipe: default.v1
+language: en
+pipeline:
+  - name: WhitespaceTokenizer
+  - name: RegexFeaturizer
+  - name: LexicalSyntacticFeaturizer
+  - name: CountVectorsFeaturizer
+  - name: CountVectorsFeaturizer
+    analyzer: char_wb
+    min_ngram: 1
+    max_ngram: 4
+  - name: DIETClassifier
+    epochs: 100
+  - name: EntitySynonymMapper
+"""
+
+
+def load_nlu_messages(nlu_path):
+    """Returns the plain text of every NLU example (entity annotations stripped)."""
+    with open(nlu_path, encoding='utf-8') as file:
+        nlu = yaml.safe_load(file).get('nlu', [])
+
+    messages = []
+    for block in nlu:
+        if 'intent' not in block:
+            continue
+        for line in block.get('examples', '').splitlines():
+            line = line.strip()
+            if line.startswith('- '):
+                messages.append(ANNOTATION.sub(r'\1', line[2:]))
+    return messages
+
+
+def summarize(label, train_seconds, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+    print(f"--- {label} ---")
+    print(f"Training/compile time: {train_seconds * 1000:.1f} ms")
+    print(f"Inference over {len(latencies)} messages: "
+          f"p50 {statistics.median(latencies) * 1000:.3f} ms, "
+          f"p95 {p95 * 1000:.3f} ms, max {latencies[-1] * 1000:.3f} ms")
+
+
+def bench_lexicon(lexicon_path, messages):
+    start = time.perf_counter()
+    terms = load_lexicon_terms(lexicon_path, 'Ibaloi_word', 'English_word')
+    automaton = build_automaton(terms, stopwords=DEFAULT_STOPWORDS)
+    compile_seconds = time.perf_counter() - start
+
+    latencies = []
+    for text in messages:
+        start = time.perf_counter()
+        lowered = text.lower()
+        select_matches(lowered, automaton.find_all(lowered))
+        latencies.append(time.perf_counter() - start)
+
+    print(f"Automaton: {automaton.size} terms, {len(automaton.goto)} states")
+    summarize("LexiconEntityExtractor", compile_seconds, latencies)
+
+
+def bench_diet(nlu_path, messages):
+    from rasa.core.agent import Agent
+    from rasa.model_training import train_nlu
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = os.path.join(tmp_dir, 'config.yml')
+        with open(config_path, 'w', encoding='utf-8') as file:
+            file.write(DIET_CONFIG)
+
+        start = time.perf_counter()
+        model_path = train_nlu(config_path, nlu_path, tmp_dir)
+        train_seconds = time.perf_counter() - start
+
+        agent = Agent.load(model_path)
+
+        async def parse_all():
+            latencies = []
+            for text in messages:
+                start = time.perf_counter()
+                await agent.parse_message(text)
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        summarize("DIETClassifier", train_seconds, asyncio.run(parse_all()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lexicon', default=DEFAULT_LEXICON_PATH)
+    parser.add_argument('--nlu', default='data/nlu.yml')
+    parser.add_argument('--diet', action='store_true', help='Also train and time a DIET pipeline')
+    args = parser.parse_args()
+
+    messages = load_nlu_messages(args.nlu)
+    bench_lexicon(args.lexicon, messages)
+    if args.diet:
+        bench_diet(args.nlu, messages)
@@ -0,0 +1,150 @@
+import csv
+import os
+from collections import deque
+
+# The lexicon kept current by nlp_lib/lexicon_sync.py (Ibaloi_word / English_word columns)
+DEFAULT_LEXICON_PATH = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..',
+    'nlp_lib', 'FINAL-Ibaloi_LexiconWordCollection - Main Lexicon.csv',
+))
+
+# Request phrasing ("what is ... in Ibaloi") that also happens to be in the lexicon
+DEFAULT_STOPWORDS = (
+    'the', 'is', 'at', 'which', 'on', 'a', 'an', 'and', 'or', 'but',
+    'to', 'of', 'in', 'for', 'with', 'by', 'what', 'how', 'do', 'does',
+    'you', 'i', 'me', 'say', 'word', 'mean', 'meaning', 'translate',
+    'to say', 'english', 'ibaloi',
+)
+
+class LexiconAutomaton:
+    """
+    Aho-Corasick automaton over lexicon terms.
+    A single left-to-right pass over the text finds every term, so lookup cost
+    depends on the message length, not on the size of the lexicon.
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.size = 0
+
+    def add(self, term, label, value):
+        """Adds a lowercased term; label is the entity name, value the canonical form."""
+        node = 0
+        for char in term:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][char] = next_node
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = next_node
+
+        entry = (len(term), label, value)
+        if entry not in self.output[node]:
+            self.output[node].append(entry)
+            self.size += 1
+
+    def build(self):
+        """Computes failure links (BFS). Must be called after the last add()."""
+        queue = deque()
+        for next_node in self.goto[0].values():
+            self.fail[next_node] = 0
+            queue.append(next_node)
+
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self.goto[node].items():
+                queue.append(next_node)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_node] = self.goto[fallback].get(char, 0)
+                self.output[next_node] = self.output[next_node] + self.output[self.fail[next_node]]
+
+    def find_all(self, text):
+        """Yields (start, end, label, value) for every term occurrence in text."""
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, label, value in self.output[node]:
+                yield index + 1 - length, index + 1, label, value
+
+
+def is_word_char(char):
+    # Hyphens and apostrophes are part of Ibaloi words (e.g. "a-aki")
+    return char.isalnum() or char in "-'"
+
+
+def select_matches(text, matches):
+    """
+    Keeps whole-word matches only, then resolves overlaps per entity type by
+    preferring the leftmost, then longest, span.
+    """
+    by_label = {}
+    for start, end, label, value in matches:
+        if start > 0 and is_word_char(text[start - 1]):
+            continue
+        if end < len(text) and is_word_char(text[end]):
+            continue
+        by_label.setdefault(label, []).append((start, end, value))
+
+    selected = []
+    for label, spans in by_label.items():
+        spans.sort(key=lambda span: (span[0], -(span[1] - span[0])))
+        last_end = -1
+        for start, end, value in spans:
+            if start >= last_end:
+                selected.append((start, end, label, value))
+                last_end = end
+
+    selected.sort()
+    return selected
+
+
+def load_lexicon_terms(path, ibaloi_column, english_column):
+    """
+    Reads the lexicon CSV into a list of (term, entity, value) tuples.
+    Raises FileNotFoundError / ValueError for a missing file or missing columns.
+    """
+    terms = []
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Lexicon file '{path}' not found")
+
+    with open(path, mode='r', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file)
+        missing = [name for name in (ibaloi_column, english_column) if name not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Lexicon file '{path}' has no {missing} column(s); found {reader.fieldnames}")
+        for row in reader:
+            ibaloi_raw = (row.get(ibaloi_column) or '').strip().lower()
+            english_raw = (row.get(english_column) or '').strip().lower()
+
+            if not ibaloi_raw or not english_raw:
+                continue
+
+            terms.append((ibaloi_raw, 'ibaloi_word', ibaloi_raw))
+            # English column may hold several comma-separated variants
+            for eng_variant in english_raw.split(','):
+                eng_variant = eng_variant.strip()
+                if eng_variant:
+                    terms.append((eng_variant, 'english_word', eng_variant))
+    return terms
+
+
+def build_automaton(terms, entities=None, stopwords=None):
+    """Compiles (term, entity, value) tuples into a ready-to-search automaton."""
+    automaton = LexiconAutomaton()
+    stopwords = set(stopwords or [])
+    for term, label, value in terms:
+        if entities is not None and label not in entities:
+            continue
+        if term in stopwords:
+            continue
+        automaton.add(term, label, value)
+    automaton.build()
+    return automaton
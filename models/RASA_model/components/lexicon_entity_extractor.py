@@ -0,0 +1,98 @@
+from typing import Any, Dict, List, Text
+
+from rasa.engine.graph import ExecutionContext, GraphComponent
+from rasa.engine.recipes.default_recipe import DefaultV1Recipe
+from rasa.engine.storage.resource import Resource
+from rasa.engine.storage.storage import ModelStorage
+from rasa.nlu.extractors.extractor import EntityExtractorMixin
+from rasa.shared.nlu.constants import (
+    ENTITIES,
+    ENTITY_ATTRIBUTE_CONFIDENCE,
+    ENTITY_ATTRIBUTE_END,
+    ENTITY_ATTRIBUTE_START,
+    ENTITY_ATTRIBUTE_TYPE,
+    ENTITY_ATTRIBUTE_VALUE,
+    TEXT,
+)
+from rasa.shared.nlu.training_data.message import Message
+from rasa.shared.nlu.training_data.training_data import TrainingData
+
+from components.lexicon_automaton import (
+    DEFAULT_LEXICON_PATH,
+    DEFAULT_STOPWORDS,
+    build_automaton,
+    load_lexicon_terms,
+    select_matches,
+)
+
+
+@DefaultV1Recipe.register(
+    [DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR], is_trainable=False
+)
+class LexiconEntityExtractor(GraphComponent, EntityExtractorMixin):
+    """
+    Extracts `english_word` and `ibaloi_word` entities by matching the lexicon
+    with an Aho-Corasick automaton. No training step: the automaton is compiled
+    from the lexicon CSV when the pipeline is loaded.
+    """
+
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            "lexicon_path": DEFAULT_LEXICON_PATH,
+            "ibaloi_column": "Ibaloi_word",
+            "english_column": "English_word",
+            # Only emit these entity types, e.g. ["english_word"]
+            "entities": ["english_word", "ibaloi_word"],
+            "stopwords": list(DEFAULT_STOPWORDS),
+        }
+
+    def __init__(self, config: Dict[Text, Any], name: Text) -> None:
+        self._config = config
+        self.name = name
+        terms = load_lexicon_terms(
+            config["lexicon_path"], config["ibaloi_column"], config["english_column"]
+        )
+        if not terms:
+            raise ValueError(f"No lexicon terms loaded from '{config['lexicon_path']}'")
+        self.automaton = build_automaton(
+            terms, set(config.get("entities") or []), config.get("stopwords")
+        )
+
+    @classmethod
+    def create(
+        cls,
+        config: Dict[Text, Any],
+        model_storage: ModelStorage,
+        resource: Resource,
+        execution_context: ExecutionContext,
+    ) -> "LexiconEntityExtractor":
+        return cls(config, execution_context.node_name)
+
+    def process_training_data(self, training_data: TrainingData) -> TrainingData:
+        return training_data
+
+    def extract(self, text: Text) -> List[Dict[Text, Any]]:
+        """Returns Rasa entity dicts for every lexicon term found in text."""
+        lowered = text.lower()
+        entities = []
+        for start, end, label, value in select_matches(lowered, self.automaton.find_all(lowered)):
+            entities.append({
+                ENTITY_ATTRIBUTE_TYPE: label,
+                ENTITY_ATTRIBUTE_START: start,
+                ENTITY_ATTRIBUTE_END: end,
+                ENTITY_ATTRIBUTE_VALUE: value,
+                ENTITY_ATTRIBUTE_CONFIDENCE: 1.0,
+            })
+        return entities
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        for message in messages:
+            text = message.get(TEXT)
+            if not text:
+                continue
+
+            entities = self.add_extractor_name(self.extract(text))
+            message.set(ENTITIES, message.get(ENTITIES, []) + entities, add_to_output=True)
+
+        return messages
@@ -0,0 +1,273 @@
+"""
+Conversation throughput benchmark for the Rasa bot and the action server.
+
+Run from models/RASA_model, e.g.:
+    # Whole bot through the REST channel (rasa run --enable-api, actions running)
+    python -m loadtest.run rest --users 50 --duration 30
+
+    # Action server webhook directly
+    python -m loadtest.run actions --users 50 --duration 30
+
+    # Actions executed in this process, with a stubbed RAG server, to measure
+    # how long the actions block the event loop
+    python -m loadtest.run inprocess --users 50 --duration 30 --stub --rag-latency 0.5
+
+    # The web app's /api/translate (lexicon + LLM refinement). With --stub, start
+    # the app with CEREBRAS_BASE_URL=http://127.0.0.1:8000 CEREBRAS_API_KEY=stub
+    python -m loadtest.run translate --users 20 --duration 30 --stub --llm-latency 1.5
+
+Reports turns/sec and latency percentiles (per action for the action targets,
+per result type for translate). Event-loop blocking is reported for the
+inprocess target only: for the others the measured loop is the load
+generator's own, not the server's.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+import uuid
+
+import httpx
+
+from loadtest.scenarios import (
+    build_action_call,
+    build_action_calls,
+    build_conversations,
+    build_translation_texts,
+)
+from loadtest.stubs import StubConfig, start_stub_server
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LoopLagMonitor:
+    """
+    Measures how late asyncio.sleep() wakes up. Any lateness beyond the
+    threshold is time during which something held the event loop (e.g. a
+    synchronous requests.post inside an async action).
+    """
+
+    def __init__(self, interval=0.01, threshold=0.002):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            if lag > self.threshold:
+                self.lags.append(lag)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.turns = 0
+
+    def record(self, key, seconds, ok=True):
+        self.turns += 1
+        self.latencies.setdefault(key, []).append(seconds)
+        if not ok:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def report(self, label, elapsed, monitor=None):
+        print(f"\n=== {label} ===")
+        print(f"Turns: {self.turns} in {elapsed:.1f}s -> {self.turns / elapsed:.1f} turns/sec")
+        print(f"{'key':<32}{'n':>7}{'err':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for key, values in sorted(self.latencies.items()):
+            print(f"{key:<32}{len(values):>7}{self.errors.get(key, 0):>6}"
+                  f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 90) * 1000:>10.1f}"
+                  f"{percentile(values, 99) * 1000:>10.1f}{max(values) * 1000:>10.1f}")
+        if monitor is None:
+            return
+        blocked = sum(monitor.lags)
+        print(f"Event loop blocked: {blocked:.3f}s total ({blocked / elapsed:.1%} of wall time), "
+              f"{len(monitor.lags)} stalls, longest {max(monitor.lags, default=0) * 1000:.1f} ms")
+
+
+async def run_users(users, duration, user_loop):
+    """Runs `users` copies of user_loop until `duration` seconds have passed."""
+    results = Results()
+    monitor = LoopLagMonitor()
+    monitor.start()
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(user_loop(user_id, deadline, results) for user_id in range(users)))
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+    return results, elapsed, monitor
+
+
+async def bench_rest(args):
+    conversations = build_conversations(
+        ['data/stories.yml', 'data/rules.yml', 'tests/test_stories.yml'], 'data/nlu.yml'
+    )
+    url = f"{args.rasa_url.rstrip('/')}/webhooks/rest/webhook"
+    limits = httpx.Limits(max_connections=args.users)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        async def user_loop(user_id, deadline, results):
+            rng = random.Random(user_id)
+            while time.perf_counter() < deadline:
+                sender = f"load-{user_id}-{uuid.uuid4().hex[:8]}"
+                for text in rng.choice(conversations):
+                    start = time.perf_counter()
+                    ok = True
+                    try:
+                        response = await client.post(url, json={"sender": sender, "message": text})
+                        ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    key = 'intent_trigger' if text.startswith('/') else 'user_text'
+                    results.record(key, time.perf_counter() - start, ok)
+
+        return await run_users(args.users, args.duration, user_loop)
+
+
+def action_call_stream(seed, calls_by_action):
+    """Endless round-robin over actions, each with a random triggering example."""
+    rng = random.Random(seed)
+    actions = [name for name, examples in calls_by_action.items() if examples]
+    for action_name in itertools.cycle(actions):
+        yield action_name, rng.choice(calls_by_action[action_name])
+
+
+async def bench_actions(args):
+    domain, calls_by_action = build_action_calls('data/nlu.yml', 'domain.yml')
+    url = f"{args.action_url.rstrip('/')}/webhook"
+    limits = httpx.Limits(max_connections=args.users)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        async def user_loop(user_id, deadline, results):
+            for action_name, example in action_call_stream(user_id, calls_by_action):
+                if time.perf_counter() >= deadline:
+                    break
+                body = build_action_call(action_name, f"load-{user_id}", example, domain)
+                start = time.perf_counter()
+                ok = True
+                try:
+                    response = await client.post(url, json=body)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                results.record(action_name, time.perf_counter() - start, ok)
+
+        return await run_users(args.users, args.duration, user_loop)
+
+
+async def bench_inprocess(args):
+    from rasa_sdk.executor import ActionExecutor
+
+    executor = ActionExecutor()
+    executor.register_package('actions')
+    domain, calls_by_action = build_action_calls('data/nlu.yml', 'domain.yml')
+
+    async def user_loop(user_id, deadline, results):
+        for action_name, example in action_call_stream(user_id, calls_by_action):
+            if time.perf_counter() >= deadline:
+                break
+            body = build_action_call(action_name, f"load-{user_id}", example, domain)
+            start = time.perf_counter()
+            ok = True
+            try:
+                await executor.run(body)
+            except Exception:
+                ok = False
+            results.record(action_name, time.perf_counter() - start, ok)
+
+    return await run_users(args.users, args.duration, user_loop)
+
+
+async def bench_translate(args):
+    texts = build_translation_texts(args.eval_csv)
+    url = f"{args.app_url.rstrip('/')}/api/translate"
+    limits = httpx.Limits(max_connections=args.users)
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        async def user_loop(user_id, deadline, results):
+            rng = random.Random(user_id)
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                key, ok = 'error', False
+                try:
+                    response = await client.post(url, json={"text": rng.choice(texts)})
+                    ok = response.status_code == 200
+                    # ai_refined = went through the LLM; lexicon_only means the app has no LLM client
+                    key = response.json().get('type', 'error') if ok else 'error'
+                except (httpx.HTTPError, ValueError):
+                    pass
+                results.record(key, time.perf_counter() - start, ok)
+
+        return await run_users(args.users, args.duration, user_loop)
+
+
+TARGETS = {
+    'rest': bench_rest,
+    'actions': bench_actions,
+    'inprocess': bench_inprocess,
+    'translate': bench_translate,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rasa conversation throughput benchmark')
+    parser.add_argument('target', choices=sorted(TARGETS))
+    parser.add_argument('--users', type=int, default=20, help='Concurrent conversations')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout (s)')
+    parser.add_argument('--rasa-url', default='http://localhost:5005')
+    parser.add_argument('--action-url', default='http://localhost:5055')
+    parser.add_argument('--app-url', default='http://localhost:8080', help='Flask web app (translate target)')
+    parser.add_argument('--eval-csv', default='../../ibaloi-evaluation.csv', help='Sentences for the translate target')
+    parser.add_argument('--stub', action='store_true', help='Start the RAG/LLM stub in this process')
+    parser.add_argument('--stub-port', type=int, default=8000)
+    parser.add_argument('--rag-latency', type=float, default=0.5)
+    parser.add_argument('--llm-latency', type=float, default=1.0)
+    args = parser.parse_args()
+
+    stub_server = None
+    if args.stub:
+        stub_server = start_stub_server(
+            port=args.stub_port, config=StubConfig(args.rag_latency, args.llm_latency)
+        )
+        # Only reaches actions imported in this process (the inprocess target);
+        # start external action servers with the same RAG_URL, and the web app
+        # with the same CEREBRAS_BASE_URL (the Cerebras SDK reads it).
+        os.environ['RAG_URL'] = f"http://127.0.0.1:{args.stub_port}/predict"
+        os.environ['CEREBRAS_BASE_URL'] = f"http://127.0.0.1:{args.stub_port}"
+        print(f"Stub RAG/LLM server on port {args.stub_port} "
+              f"(RAG {args.rag_latency}s, LLM {args.llm_latency}s)")
+        if args.target == 'translate':
+            print(f"Start the web app with CEREBRAS_BASE_URL={os.environ['CEREBRAS_BASE_URL']} "
+                  f"CEREBRAS_API_KEY=stub so its LLM calls hit the stub")
+
+    try:
+        results, elapsed, monitor = asyncio.run(TARGETS[args.target](args))
+        # Only the inprocess target runs the server code on the measured event loop
+        results.report(f"{args.target}: {args.users} users, {args.duration:.0f}s", elapsed,
+                       monitor if args.target == 'inprocess' else None)
+    finally:
+        if stub_server:
+            stub_server.shutdown()
@@ -0,0 +1,125 @@
+"""
+Turns the bot's training data into replayable conversations and action calls.
+"""
+import csv
+import re
+
+import yaml
+
+ANNOTATION = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+
+
+def read_yaml(path):
+    with open(path, encoding='utf-8') as file:
+        return yaml.safe_load(file) or {}
+
+
+def parse_example(example):
+    """Returns (plain_text, entities) for an annotated NLU example."""
+    entities = []
+    plain = ''
+    last = 0
+    for match in ANNOTATION.finditer(example):
+        plain += example[last:match.start()]
+        entities.append({
+            "entity": match.group(2),
+            "value": match.group(1),
+            "start": len(plain),
+            "end": len(plain) + len(match.group(1)),
+        })
+        plain += match.group(1)
+        last = match.end()
+    return plain + example[last:], entities
+
+
+def load_nlu_examples(nlu_path):
+    """Returns a list of {"intent", "text", "entities"} dicts."""
+    examples = []
+    for block in read_yaml(nlu_path).get('nlu', []):
+        if 'intent' not in block:
+            continue
+        for line in (block.get('examples') or '').splitlines():
+            line = line.strip()
+            if line.startswith('- '):
+                text, entities = parse_example(line[2:])
+                examples.append({"intent": block['intent'], "text": text, "entities": entities})
+    return examples
+
+
+def load_story_conversations(stories_path):
+    """
+    Returns one list of user messages per story/rule.
+    Test stories carry the user text; training stories only name the intent, which
+    is replayed as "/intent" so the bot skips NLU for that turn.
+    """
+    data = read_yaml(stories_path)
+    conversations = []
+    for story in data.get('stories', []) + data.get('rules', []):
+        turns = []
+        for step in story.get('steps', []):
+            if 'user' in step:
+                turns.append(parse_example(step['user'].strip())[0])
+            elif 'intent' in step:
+                turns.append(f"/{step['intent']}")
+        if turns:
+            conversations.append(turns)
+    return conversations
+
+
+def build_conversations(story_paths, nlu_path):
+    """All stories plus every NLU example as a single-turn conversation."""
+    conversations = []
+    for path in story_paths:
+        conversations.extend(load_story_conversations(path))
+    conversations.extend([example['text']] for example in load_nlu_examples(nlu_path))
+    return conversations
+
+
+def build_translation_texts(csv_path):
+    """Ibaloi and English sentences from the evaluation set, for /api/translate."""
+    with open(csv_path, encoding='utf-8-sig') as file:
+        rows = list(csv.DictReader(file))
+    return [row['source_text'] for row in rows] + [row['target_text'] for row in rows]
+
+
+def build_action_call(action_name, sender_id, example, domain):
+    """Builds the JSON body Rasa posts to the action server's /webhook."""
+    slots = {entity['entity']: entity['value'] for entity in example['entities']}
+    return {
+        "next_action": action_name,
+        "sender_id": sender_id,
+        "tracker": {
+            "sender_id": sender_id,
+            "slots": slots,
+            "latest_message": {
+                "text": example['text'],
+                "intent": {"name": example['intent'], "confidence": 1.0},
+                "entities": example['entities'],
+            },
+            "latest_event_time": None,
+            "latest_input_channel": "rest",
+            "latest_action_name": "action_listen",
+            "events": [],
+            "paused": False,
+            "followup_action": None,
+            "active_loop": {},
+        },
+        "domain": domain,
+        "version": "3.1.0",
+    }
+
+
+def build_action_calls(nlu_path, domain_path):
+    """
+    Pairs each custom action with the examples that would trigger it:
+    ask_ibaloi examples (which fill english_word) for the translator, and every
+    other example for the RAG fallback.
+    """
+    domain = read_yaml(domain_path)
+    examples = load_nlu_examples(nlu_path)
+    translate = [example for example in examples if example['intent'] == 'ask_ibaloi']
+    fallback = [example for example in examples if example['intent'] != 'ask_ibaloi']
+    return domain, {
+        "action_translate_to_ibaloi": translate,
+        "action_rag_call": fallback,
+    }
@@ -0,0 +1,104 @@
+"""
+Local stand-ins for the RAG server and the LLM endpoint.
+
+Run from models/RASA_model:
+    python -m loadtest.stubs --port 8000 --rag-latency 0.8 --llm-latency 1.5
+
+Then start the action server with RAG_URL=http://localhost:8000/predict, and
+the web app with CEREBRAS_BASE_URL=http://localhost:8000 CEREBRAS_API_KEY=stub
+(the Cerebras SDK posts to <base>/v1/chat/completions).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubConfig:
+    """Latency (seconds) and jitter applied to every stubbed response."""
+
+    def __init__(self, rag_latency=0.5, llm_latency=1.0, jitter=0.1):
+        self.rag_latency = rag_latency
+        self.llm_latency = llm_latency
+        self.jitter = jitter
+
+    def delay(self, base):
+        time.sleep(max(0.0, base + random.uniform(-self.jitter, self.jitter) * base))
+
+
+def make_handler(config):
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass  # Keep the load test output readable
+
+        def read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                return json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return {}
+
+        def send_json(self, payload, status=200):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            payload = self.read_json()
+
+            # Same contract as rag_server:8000/predict used by ActionRAGCall
+            if self.path.rstrip('/') == '/predict':
+                config.delay(config.rag_latency)
+                self.send_json({"text": f"[stub RAG answer] {payload.get('query', '')}"})
+
+            # OpenAI-style chat completions, as spoken by the Cerebras SDK
+            elif self.path.rstrip('/').endswith('/chat/completions'):
+                config.delay(config.llm_latency)
+                self.send_json({
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": payload.get('model', 'stub'),
+                    "choices": [{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "stub translation"},
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+            else:
+                self.send_json({"error": f"Unknown stub route {self.path}"}, status=404)
+
+    return StubHandler
+
+
+def start_stub_server(host='127.0.0.1', port=8000, config=None):
+    """Starts the stub server on a daemon thread and returns it (call .shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config or StubConfig()))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub RAG / LLM server for load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--rag-latency', type=float, default=0.5)
+    parser.add_argument('--llm-latency', type=float, default=1.0)
+    parser.add_argument('--jitter', type=float, default=0.1, help='Relative jitter, e.g. 0.1 = +/-10%%')
+    args = parser.parse_args()
+
+    stub = StubConfig(args.rag_latency, args.llm_latency, args.jitter)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub))
+    print(f"Stub RAG/LLM server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
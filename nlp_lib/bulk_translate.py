@@ -0,0 +1,322 @@
+"""
+Streaming bulk translation through IbaloiTranslator.
+
+    python -m nlp_lib.bulk_translate corpus.csv out.jsonl --column source_text
+    python -m nlp_lib.bulk_translate sentences.txt out.csv --concurrency 8
+    python -m nlp_lib.bulk_translate corpus.jsonl out.jsonl --field text --resume
+
+Lexicon lookup runs in a process pool. With the fork start method the workers
+share the lexicon already loaded by this process, so it is not re-read or
+pickled. LLM refinements run on a bounded thread pool. Results are written
+incrementally in input order, and only a fixed window of batches is in flight,
+so memory stays flat whatever the input size. A checkpoint next to the output
+allows --resume after an interruption.
+"""
+import os, sys, csv, json, time, signal, argparse, itertools
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from tqdm import tqdm
+
+from nlp_lib.gen_lex import IbaloiTranslator
+
+DEFAULT_LEXICON = 'nlp_lib/FINAL-Ibaloi_LexiconWordCollection - Main Lexicon.csv'
+
+# Set in the parent before the pool forks; spawned workers build their own
+_TRANSLATOR = None
+
+
+def _init_worker(csv_path):
+    global _TRANSLATOR
+    # Ctrl-C is handled by the parent, which then shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if _TRANSLATOR is None:
+        # Lookup only: workers never call the LLM
+        _TRANSLATOR = IbaloiTranslator(csv_path=csv_path)
+        _TRANSLATOR.client = None
+
+
+def _prepare_batch(texts):
+    return [_TRANSLATOR.prepare(text) if text else None for text in texts]
+
+
+# --- Input / output ---
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower()
+    return {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}.get(ext, 'txt')
+
+
+def iter_inputs(path, fmt, column=None):
+    """
+    Yields (record, text) lazily; record is what gets echoed to the output.
+    Raises ValueError right away, before anything is yielded, when a CSV
+    has no header or no such column.
+    """
+    file = open(path, 'r', encoding='utf-8-sig', newline='')
+    reader = None
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        if not reader.fieldnames:
+            file.close()
+            raise ValueError(f"{path} has no CSV header")
+        if column and column not in reader.fieldnames:
+            file.close()
+            raise ValueError(f"Column {column!r} not in {path} (columns: {', '.join(reader.fieldnames)})")
+        column = column or reader.fieldnames[0]
+    return _read_inputs(file, fmt, column, reader)
+
+
+def _read_inputs(file, fmt, column, reader):
+    with file:
+        if fmt == 'csv':
+            for row in reader:
+                yield row, (row.get(column) or '').strip()
+        elif fmt == 'jsonl':
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record, str(record.get(column or 'text') or '').strip()
+        else:
+            for line in file:
+                text = line.rstrip('\r\n')
+                yield {'text': text}, text.strip()
+
+
+class OutputWriter:
+    """Appends results in the output format; position() is used for checkpoints."""
+
+    def __init__(self, path, fmt, resume_at=None):
+        self.fmt = fmt
+        if resume_at is not None and os.path.exists(path):
+            # Drop anything written after the last checkpoint
+            with open(path, 'r+b') as file:
+                file.truncate(resume_at)
+            self.file = open(path, 'a', encoding='utf-8', newline='')
+            self.header_written = True
+        else:
+            self.file = open(path, 'w', encoding='utf-8', newline='')
+            self.header_written = False
+        self.csv_writer = None
+
+    def write(self, record, result):
+        if self.fmt == 'jsonl':
+            self.file.write(json.dumps({'input': record, **result}, ensure_ascii=False) + '\n')
+        elif self.fmt == 'csv':
+            row = {**record, 'translation': result.get('translation', ''), 'direction': result.get('direction', ''),
+                   'type': result.get('type', ''), 'error': result.get('error', '')}
+            if self.csv_writer is None:
+                self.csv_writer = csv.DictWriter(self.file, fieldnames=list(row), extrasaction='ignore')
+                if not self.header_written:
+                    self.csv_writer.writeheader()
+                    self.header_written = True
+            self.csv_writer.writerow(row)
+        else:
+            # One line per input line, keeping line alignment for multi-line LLM output
+            self.file.write(result.get('translation', '').replace('\n', ' ') + '\n')
+
+    def position(self):
+        self.file.flush()
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    return None
+
+
+def input_stamp(path):
+    """Identifies the input a checkpoint belongs to."""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def save_checkpoint(path, done, output_bytes, source):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({'done': done, 'output_bytes': output_bytes, 'input': source}, file)
+    os.replace(tmp_path, path)
+
+
+def check_checkpoint(checkpoint, source, output_path):
+    """Raises ValueError when a checkpoint cannot be resumed from for this input and output."""
+    if checkpoint.get('input') != source:
+        raise ValueError(f"Checkpoint was written for a different or modified input ({checkpoint.get('input')}); "
+                         f"delete it or run without --resume")
+    output_size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+    if output_size < checkpoint['output_bytes']:
+        raise ValueError(f"Output {output_path} is shorter ({output_size} bytes) than the checkpoint "
+                         f"({checkpoint['output_bytes']} bytes); run without --resume")
+
+
+# --- Pipeline ---
+
+def _chain(source, target):
+    """Copies a finished future's outcome into another future."""
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def _dispatch(translator, refine_pool, item_futures, lookup_future):
+    """Runs when a lookup batch returns: finishes memory/lexicon-only items, queues the rest for the LLM."""
+    try:
+        prepared_batch = lookup_future.result()
+    except BaseException as e:
+        for future in item_futures:
+            future.set_exception(e)
+        return
+
+    for prepared, future in zip(prepared_batch, item_futures):
+        if prepared is None:
+            future.set_result({"error": "No text provided", "success": False})
+        elif translator.needs_refinement(prepared):
+            refine_pool.submit(translator.finish, prepared).add_done_callback(
+                lambda done, future=future: _chain(done, future)
+            )
+        else:
+            future.set_result(translator.finish(prepared))
+
+
+def bulk_translate(input_path, output_path, in_format=None, out_format=None, column=None,
+                   lexicon=DEFAULT_LEXICON, workers=None, concurrency=4, batch_size=64,
+                   window=8, checkpoint_every=500, resume=False):
+    """
+    Translates every input record and writes results in input order.
+    Returns {"translated", "skipped", "seconds", "per_second"}.
+    Raises ValueError for an unknown CSV column, or when resume=True and the
+    checkpoint does not match the input/output.
+    """
+    in_format = detect_format(input_path, in_format)
+    out_format = detect_format(output_path, out_format)
+    checkpoint_path = f"{output_path}.checkpoint.json"
+
+    source = input_stamp(input_path)
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint:
+        check_checkpoint(checkpoint, source, output_path)
+    skipped = checkpoint['done'] if checkpoint else 0
+
+    global _TRANSLATOR
+    translator = IbaloiTranslator(csv_path=lexicon)
+    _TRANSLATOR = translator
+
+    # fork shares the loaded lexicon copy-on-write; spawn (Windows/macOS default) reloads per worker
+    context = mp.get_context('fork' if 'fork' in mp.get_all_start_methods() else 'spawn')
+    # Opened first so a bad --column fails before the output is touched
+    records = itertools.islice(iter_inputs(input_path, in_format, column), skipped, None)
+    writer = OutputWriter(output_path, out_format, resume_at=checkpoint['output_bytes'] if checkpoint else None)
+
+    done = skipped
+    start = time.perf_counter()
+    progress = None
+
+    def write_head(pending):
+        nonlocal done
+        batch, item_futures = pending.popleft()
+        for (record, _), future in zip(batch, item_futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": str(e), "success": False}
+            writer.write(record, result)
+            done += 1
+            progress.update(1)
+            if done % checkpoint_every == 0:
+                save_checkpoint(checkpoint_path, done, writer.position(), source)
+
+    workers = workers or os.cpu_count() or 1
+    lookup_pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                      initializer=_init_worker, initargs=(lexicon,))
+    refine_pool = None
+    finished = False
+    try:
+        # Start every worker now, before this process has any threads (safe fork)
+        for future in [lookup_pool.submit(_prepare_batch, []) for _ in range(workers)]:
+            future.result()
+
+        refine_pool = ThreadPoolExecutor(max_workers=concurrency)
+        progress = tqdm(initial=skipped, unit='rec', desc='Translating', smoothing=0.1)
+        pending = deque()
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+
+            item_futures = [Future() for _ in batch]
+            lookup_future = lookup_pool.submit(_prepare_batch, [text for _, text in batch])
+            lookup_future.add_done_callback(
+                lambda f, item_futures=item_futures: _dispatch(translator, refine_pool, item_futures, f)
+            )
+            pending.append((batch, item_futures))
+
+            # Bounded window keeps memory flat: at most `window` batches in flight
+            while len(pending) >= window:
+                write_head(pending)
+
+        while pending:
+            write_head(pending)
+        save_checkpoint(checkpoint_path, done, writer.position(), source)
+        finished = True
+    finally:
+        # On Ctrl-C don't wait for in-flight work; --resume restarts from the last checkpoint
+        lookup_pool.shutdown(wait=finished, cancel_futures=not finished)
+        if refine_pool is not None:
+            refine_pool.shutdown(wait=finished, cancel_futures=not finished)
+        if progress is not None:
+            progress.close()
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    translated = done - skipped
+    return {
+        "translated": translated,
+        "skipped": skipped,
+        "seconds": round(elapsed, 2),
+        "per_second": round(translated / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk-translate CSV, JSONL or plain text with IbaloiTranslator')
+    parser.add_argument('input', help='Input file (.csv, .jsonl or plain text, one sentence per line)')
+    parser.add_argument('output', help='Output file (.csv, .jsonl or plain text)')
+    parser.add_argument('--in-format', choices=['csv', 'jsonl', 'txt'])
+    parser.add_argument('--out-format', choices=['csv', 'jsonl', 'txt'])
+    parser.add_argument('--column', '--field', dest='column',
+                        help='CSV column / JSONL field holding the text (default: first column / "text")')
+    parser.add_argument('--lexicon', default=DEFAULT_LEXICON)
+    parser.add_argument('--workers', type=int, default=None, help='Lookup processes (default: CPU count)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Concurrent LLM refinements')
+    parser.add_argument('--batch-size', type=int, default=64, help='Records per lookup task')
+    parser.add_argument('--window', type=int, default=8, help='Batches in flight')
+    parser.add_argument('--checkpoint-every', type=int, default=500, help='Records between checkpoints')
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint')
+    args = parser.parse_args()
+
+    try:
+        summary = bulk_translate(
+            args.input, args.output, args.in_format, args.out_format, args.column, args.lexicon,
+            args.workers, args.concurrency, args.batch_size, args.window, args.checkpoint_every, args.resume
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        checkpoint_path = f"{args.output}.checkpoint.json"
+        if os.path.exists(checkpoint_path):
+            print(f"\nInterrupted. Progress up to the last checkpoint is in {checkpoint_path}; "
+                  f"run the same command with --resume to continue.", file=sys.stderr)
+        else:
+            print("\nInterrupted before the first checkpoint; run the command again to start over.", file=sys.stderr)
+        sys.exit(130)
+    print(f"Translated {summary['translated']} records in {summary['seconds']}s "
+          f"({summary['per_second']} rec/s), {summary['skipped']} skipped via checkpoint")
@@ -1,9 +1,11 @@
-import os, hashlib, zipfile, shutil, logging
+import os, io, json, time, hashlib, zipfile, shutil, logging, threading
+from concurrent.futures import ThreadPoolExecutor
 from xml.etree import ElementTree as ET
 from docx import Document
 from docx.table import Table
 from docx.text.paragraph import Paragraph
 from docx.shared import Inches
+from PIL import Image
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -12,8 +14,19 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # 2. URL path your client (e.g., Flask/Django/React app) uses to access the images
 # This URL is relative to the web server root.
 IMAGE_URL_BASE = '/assets/extracted_images/' 
+# 3. Responsive image variants: target widths (px), encoder quality and worker threads
+IMAGE_WIDTHS = (320, 640, 1024)
+IMAGE_QUALITY = 80
+IMAGE_WORKERS = min(8, (os.cpu_count() or 1) + 2)
+# Browsers pick the variant from srcset using this rendered-width hint
+IMAGE_SIZES = '(max-width: 768px) 100vw, 768px'
+# 4. Cleanup only deletes variants no document references, once they are this old (s)
+IMAGE_MANIFEST = '.manifest.json'
+IMAGE_STALE_SECONDS = 600
 # ---------------------
 
+_manifest_lock = threading.Lock()
+
 # Define the namespace map for OpenXML elements
 NS_MAP = {
     'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
@@ -41,44 +54,154 @@ def get_relationships_map(doc_archive):
     return rels_map
 
 
-def extract_and_save_image(doc_archive, rels_map, r_id, output_dir):
+def save_image_variants(image_bytes, media_path, output_dir):
     """
-    Extracts an image from the ZIP archive and saves it locally.
-    output_dir must be the absolute path to the 'extracted_images' folder.
+    Writes downscaled WebP and JPEG copies of an image at each IMAGE_WIDTHS
+    width (never upscaled). Files are named by the SHA1 of the original bytes,
+    so an image that was already processed is not decoded or encoded again.
+    Falls back to saving the original file when Pillow cannot read the format
+    (e.g. EMF/WMF drawings).
+
+    Returns a dict describing the variants, used by build_image_html().
     """
-    media_path = rels_map.get(r_id)
-    if not media_path:
-        logging.warning(f"Relationship ID {r_id} not mapped to a media file.")
-        return None
+    digest = hashlib.sha1(image_bytes).hexdigest()
+    info = {
+        'hash': digest,
+        'original_bytes': len(image_bytes),
+        'width': None,
+        'height': None,
+        'variants': {'webp': [], 'jpg': []},
+        'fallback_url': None,
+    }
+    os.makedirs(output_dir, exist_ok=True)
 
     try:
-        image_bytes = doc_archive.read(media_path)
-        
-        # Use SHA1 hash for a unique, consistent filename
-        hash_object = hashlib.sha1(image_bytes)
-        # Extract extension using the forward slash path
+        with Image.open(io.BytesIO(image_bytes)) as source:
+            # Image.open only reads the header, so cached images are never decoded
+            info['width'], info['height'] = source.size
+            widths = sorted({min(width, source.width) for width in IMAGE_WIDTHS})
+            flat = None
+
+            for width in widths:
+                height = max(1, round(source.height * width / source.width))
+                resized = None
+
+                for ext, pil_format in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                    filename = f"{digest}-{width}.{ext}"
+                    save_path = os.path.join(output_dir, filename)
+
+                    if not os.path.exists(save_path):
+                        if flat is None:
+                            # JPEG has no alpha channel: flatten transparent images onto white
+                            if source.mode in ('RGBA', 'LA', 'P'):
+                                rgba = source.convert('RGBA')
+                                flat = Image.new('RGB', rgba.size, (255, 255, 255))
+                                flat.paste(rgba, mask=rgba.split()[-1])
+                            else:
+                                flat = source.convert('RGB')
+                        if resized is None:
+                            resized = flat if width == flat.width else flat.resize((width, height), Image.LANCZOS)
+                        resized.save(save_path, pil_format, quality=IMAGE_QUALITY, optimize=True)
+                        logging.info(f"Saved image variant: {filename}")
+
+                    info['variants'][ext].append((f"{IMAGE_URL_BASE}{filename}", width, os.path.getsize(save_path)))
+
+        # Middle-sized JPEG for browsers without srcset support
+        jpgs = info['variants']['jpg']
+        info['fallback_url'] = jpgs[len(jpgs) // 2][0]
+
+    except Exception as e:
+        logging.warning(f"Could not transcode {media_path} ({e}); serving original file.")
         file_ext = os.path.splitext(media_path.split('/')[-1])[1].lstrip('.')
-        filename = f"{hash_object.hexdigest()}.{file_ext}" 
-        
-        # save_path uses os.path.join because it is a local file system operation
+        filename = f"{digest}.{file_ext}"
         save_path = os.path.join(output_dir, filename)
-
-        # Create directories and save file only if it doesn't exist
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
         if not os.path.exists(save_path):
             with open(save_path, 'wb') as f:
                 f.write(image_bytes)
-            logging.info(f"Saved new image: {filename} at {save_path}")
-        
-        return f"{IMAGE_URL_BASE}{filename}"
-    except Exception as e:
-        logging.error(f"Failed to extract or save image from {media_path}: {e}")
-        return None
+        info['fallback_url'] = f"{IMAGE_URL_BASE}{filename}"
+
+    return info
+
+
+def build_image_html(info):
+    """Renders a lazy-loaded <picture> with WebP/JPEG srcsets for save_image_variants() output."""
+    style = 'max-width:100%; height:auto; display:block; margin: 10px 0;'
+
+    if not info['variants']['jpg']:
+        return f'<img src="{info["fallback_url"]}" loading="lazy" decoding="async" style="{style}" alt="Document Image" />'
+
+    def srcset(ext):
+        return ', '.join(f"{url} {width}w" for url, width, _ in info['variants'][ext])
+
+    return (
+        '<picture>'
+        f'<source type="image/webp" srcset="{srcset("webp")}" sizes="{IMAGE_SIZES}" />'
+        f'<img src="{info["fallback_url"]}" srcset="{srcset("jpg")}" sizes="{IMAGE_SIZES}" '
+        f'width="{info["width"]}" height="{info["height"]}" loading="lazy" decoding="async" '
+        f'style="{style}" alt="Document Image" />'
+        '</picture>'
+    )
+
+
+def log_page_weight(image_infos, elapsed):
+    """Logs parse wall time and how many image bytes a mobile/desktop visitor downloads."""
+    original = sum(info['original_bytes'] for info in image_infos)
+    smallest = 0
+    largest = 0
+    for info in image_infos:
+        webp = info['variants']['webp']
+        if webp:
+            smallest += webp[0][2]
+            largest += webp[-1][2]
+        else:
+            smallest += info['original_bytes']
+            largest += info['original_bytes']
+
+    logging.info(
+        f"Document parsed in {elapsed:.2f}s; {len(image_infos)} images. "
+        f"Image weight: original {original / 1024:.0f} KB, "
+        f"mobile (smallest WebP) {smallest / 1024:.0f} KB, "
+        f"desktop (largest WebP) {largest / 1024:.0f} KB"
+    )
+
+def load_image_manifest(image_dir):
+    """{document path: [image hashes]} for every document whose images were extracted."""
+    manifest_path = os.path.join(image_dir, IMAGE_MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except ValueError as e:
+        logging.warning(f"Ignoring unreadable image manifest {manifest_path}: {e}")
+        return {}
+
+
+def save_image_manifest(image_dir, manifest):
+    os.makedirs(image_dir, exist_ok=True)
+    manifest_path = os.path.join(image_dir, IMAGE_MANIFEST)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def record_document_images(image_dir, abs_filepath, hashes):
+    """Stores the image hashes a document currently uses, replacing those of its previous version."""
+    with _manifest_lock:
+        manifest = load_image_manifest(image_dir)
+        if not hashes and abs_filepath not in manifest:
+            return  # nothing to record for a document without images
+        manifest[abs_filepath] = sorted(hashes)
+        save_image_manifest(image_dir, manifest)
+
 
 def cleanup_extracted_images(root_dir):
     """
-    Deletes all files within the assets/extracted_images directory, 
-    but preserves the directory structure.
+    Deletes stale files within the assets/extracted_images directory: image
+    variants no longer referenced by any existing document in the manifest and
+    older than IMAGE_STALE_SECONDS. Variants still in use stay cached, so the
+    next document view does not transcode its images again.
     
     Args:
         root_dir (str): The absolute path to the Flask application root.
@@ -93,71 +216,44 @@ def cleanup_extracted_images(root_dir):
     # 2. Safety Check: Only proceed if the path is confirmed to be under assets
     if 'assets' in cleanup_dir and os.path.isdir(cleanup_dir):
         
-        logging.info(f"Starting cleanup of extracted images in: {cleanup_dir}")
-        
         try:
+            with _manifest_lock:
+                manifest = load_image_manifest(cleanup_dir)
+                # Documents that were deleted no longer keep their images alive
+                live_manifest = {path: hashes for path, hashes in manifest.items() if os.path.exists(path)}
+                if live_manifest != manifest:
+                    save_image_manifest(cleanup_dir, live_manifest)
+            live_hashes = {digest for hashes in live_manifest.values() for digest in hashes}
+
+            cutoff = time.time() - IMAGE_STALE_SECONDS
+            removed = 0
             # Iterate over all items in the directory
             for item in os.listdir(cleanup_dir):
                 item_path = os.path.join(cleanup_dir, item)
-                
+                # Files are named <sha1>.<ext> or <sha1>-<width>.<ext>
+                digest = item.split('.')[0].split('-')[0]
+
                 # Ensure we only delete files, not subdirectories (though none should exist)
-                if os.path.isfile(item_path):
+                if item.startswith('.') or digest in live_hashes or not os.path.isfile(item_path):
+                    continue
+                if os.path.getmtime(item_path) < cutoff:
                     os.remove(item_path)
-                    
-            logging.info("Successfully deleted all extracted image files.")
+                    removed += 1
+
+            if removed:
+                logging.info(f"Deleted {removed} stale extracted image files from {cleanup_dir}")
 
         except Exception as e:
             logging.error(f"Error during image cleanup in {cleanup_dir}: {e}")
     else:
         logging.error(f"Cleanup directory check failed for: {cleanup_dir}")
 
-def get_content_sections(filepath, root_dir=None):
+def parse_blocks(doc, doc_archive, rels_map, image_pool, image_futures, save_dir):
     """
-    Reads a .docx file, extracts sections (headers, content, tables, and images), 
-    and returns the data in a structured list.
+    Walks the document body and returns the sections. Embedded images are
+    submitted to image_pool (keyed by media path in image_futures) and left as
+    <!--image:...--> placeholders; pass doc_archive=None to skip images.
     """
-    
-    # 1. Path Resolution and Error Check
-    try:
-        normalized_filepath = os.path.normpath(filepath)
-        
-        if root_dir:
-            base_dir = root_dir
-        else:
-            # Fallback for testing outside Flask
-            base_dir = os.path.dirname(os.path.abspath(__file__)) 
-
-        abs_filepath = os.path.join(base_dir, normalized_filepath)
-        
-        if not os.path.exists(abs_filepath):
-            raise FileNotFoundError(f"Document file not found at: {abs_filepath}")
-            
-        doc = Document(abs_filepath)
-        
-    except FileNotFoundError as e:
-        raise
-    except Exception as e:
-        logging.error(f"File system or docx loading error: {e}")
-        raise 
-    
-    # --- FIX: Define the absolute save path relative to the Flask app root ---
-    if root_dir:
-        # If root_dir is provided (it is the Flask app root), use it to find the assets folder.
-        SAVE_DIR_ABSOLUTE = os.path.join(root_dir, 'assets', 'extracted_images')
-    else:
-        # If not in Flask (e.g., in __main__ test block), fallback to relative path from script dir
-        SAVE_DIR_ABSOLUTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'extracted_images')
-    
-    
-    # --- IMAGE PREP: Extract relationships from the DOCX ZIP archive ---
-    doc_archive = None 
-    rels_map = {} 
-    try:
-        doc_archive = zipfile.ZipFile(abs_filepath, 'r')
-        rels_map = get_relationships_map(doc_archive)
-    except Exception as e:
-        logging.error(f"Could not open DOCX as ZIP archive for image extraction: {e}")
-        
     # 2. Interleave Paragraphs and Tables for Correct Ordering
     all_blocks = []
     for block in doc.element.body:
@@ -211,13 +307,25 @@ def get_content_sections(filepath, root_dir=None):
                     r_id = blip.get(f"{{{NS_MAP['r']}}}embed")
 
                     if r_id and doc_archive:
-                        # PASS THE ABSOLUTE SAVE PATH
-                        image_url = extract_and_save_image(doc_archive, rels_map, r_id, SAVE_DIR_ABSOLUTE) 
-                        
-                        if image_url:
-                            # Basic fixed size for compatibility
-                            paragraph_html += f'<img src="{image_url}" style="max-width:100%; height:auto; display:block; margin: 10px 0;" alt="Document Image" />'
-                            
+                        media_path = rels_map.get(r_id)
+                        if not media_path:
+                            logging.warning(f"Relationship ID {r_id} not mapped to a media file.")
+                            continue
+
+                        # Same image referenced twice is only processed once
+                        if media_path not in image_futures:
+                            try:
+                                image_bytes = doc_archive.read(media_path)
+                            except KeyError:
+                                logging.error(f"Media file {media_path} missing from DOCX archive.")
+                                continue
+                            # PASS THE ABSOLUTE SAVE PATH
+                            image_futures[media_path] = image_pool.submit(
+                                save_image_variants, image_bytes, media_path, save_dir
+                            )
+
+                        paragraph_html += f'<!--image:{media_path}-->'
+
                 
                 # If there's content (text or images) in the paragraph, wrap it in a <p> tag
                 if paragraph_html.strip():
@@ -246,11 +354,98 @@ def get_content_sections(filepath, root_dir=None):
     if current_section is not None:
         content_sections.append(current_section)
 
-    if doc_archive:
-        try:
-            doc_archive.close()
-        except Exception:
-            pass # Ignore close errors
+    return content_sections
+
+
+def get_content_sections(filepath, root_dir=None, include_images=True):
+    """
+    Reads a .docx file, extracts sections (headers, content, tables, and images), 
+    and returns the data in a structured list.
+    With include_images=False embedded images are skipped (text-only callers such as the search index).
+    """
+    
+    parse_start = time.perf_counter()
+
+    # 1. Path Resolution and Error Check
+    try:
+        normalized_filepath = os.path.normpath(filepath)
+        
+        if root_dir:
+            base_dir = root_dir
+        else:
+            # Fallback for testing outside Flask
+            base_dir = os.path.dirname(os.path.abspath(__file__)) 
+
+        abs_filepath = os.path.join(base_dir, normalized_filepath)
+        
+        if not os.path.exists(abs_filepath):
+            raise FileNotFoundError(f"Document file not found at: {abs_filepath}")
+            
+        doc = Document(abs_filepath)
+        
+    except FileNotFoundError as e:
+        raise
+    except Exception as e:
+        logging.error(f"File system or docx loading error: {e}")
+        raise 
+    
+    # --- FIX: Define the absolute save path relative to the Flask app root ---
+    if root_dir:
+        # If root_dir is provided (it is the Flask app root), use it to find the assets folder.
+        SAVE_DIR_ABSOLUTE = os.path.join(root_dir, 'assets', 'extracted_images')
+    else:
+        # If not in Flask (e.g., in __main__ test block), fallback to relative path from script dir
+        SAVE_DIR_ABSOLUTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets', 'extracted_images')
+    
+    
+    # --- IMAGE PREP: Extract relationships from the DOCX ZIP archive ---
+    doc_archive = None 
+    rels_map = {} 
+    try:
+        doc_archive = zipfile.ZipFile(abs_filepath, 'r')
+        rels_map = get_relationships_map(doc_archive)
+    except Exception as e:
+        logging.error(f"Could not open DOCX as ZIP archive for image extraction: {e}")
+
+    # Images are decoded/resized/encoded on a thread pool while the text is parsed.
+    # Paragraphs get a placeholder that is swapped for the <picture> markup at the end.
+    image_pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS)
+    image_futures = {}
+
+    try:
+        content_sections = parse_blocks(
+            doc, doc_archive if include_images else None, rels_map, image_pool, image_futures, SAVE_DIR_ABSOLUTE
+        )
+
+        # Wait for the image workers and swap the placeholders for responsive markup
+        image_infos = []
+        image_html = {}
+        for media_path, future in image_futures.items():
+            try:
+                info = future.result()
+            except Exception as e:
+                logging.error(f"Failed to extract or save image from {media_path}: {e}")
+                image_html[media_path] = ''
+                continue
+            image_infos.append(info)
+            image_html[media_path] = build_image_html(info)
+    finally:
+        image_pool.shutdown(cancel_futures=True)
+        if doc_archive:
+            try:
+                doc_archive.close()
+            except Exception:
+                pass # Ignore close errors
+
+    if include_images and doc_archive:
+        record_document_images(SAVE_DIR_ABSOLUTE, abs_filepath, {info['hash'] for info in image_infos})
+
+    if image_html:
+        for section in content_sections:
+            for media_path, html in image_html.items():
+                section['content'] = section['content'].replace(f'<!--image:{media_path}-->', html)
+
+    log_page_weight(image_infos, time.perf_counter() - parse_start)
 
     return content_sections
 
@@ -0,0 +1,259 @@
+import os, re, json, html, math, time, hashlib, logging
+from collections import Counter
+
+from nlp_lib.doc_reader import get_content_sections
+
+# --- CONFIGURATION ---
+# Where search indexes are persisted, relative to the Flask app root
+INDEX_CACHE_DIR = os.path.join('assets', 'doc_cache')
+INDEX_VERSION = 1
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Term frequency multiplier for words appearing in a section header
+HEADER_WEIGHT = 3
+SNIPPET_CHARS = 160
+# ---------------------
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[-']\w+)*")
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# In-memory copy of each loaded index, keyed by absolute DOCX path
+_INDEXES = {}
+
+
+def tokenize(text):
+    """Lowercased word tokens; keeps hyphenated Ibaloi words (e.g. a-aki) whole."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def html_to_text(content_html):
+    """Strips the markup produced by get_content_sections (paragraphs, tables, images)."""
+    text = TAG_PATTERN.sub(' ', content_html)
+    return re.sub(r'\s+', ' ', html.unescape(text)).strip()
+
+
+def file_stamp(abs_filepath):
+    """Identifies a DOCX version by size, mtime and content hash."""
+    stat = os.stat(abs_filepath)
+    with open(abs_filepath, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest}
+
+
+class SectionIndex:
+    """
+    Inverted index with BM25 ranking over document sections.
+    Each section is indexed from its header (weighted by HEADER_WEIGHT),
+    paragraph text and table cell text.
+    """
+
+    def __init__(self, sections, postings, lengths, source=None):
+        self.sections = sections
+        self.postings = postings
+        self.lengths = lengths
+        self.source = source or {}
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, content_sections, source=None):
+        sections = []
+        postings = {}
+        lengths = []
+
+        for section_id, section in enumerate(content_sections):
+            header = section.get('header_text', '')
+            text = html_to_text(section.get('content', ''))
+
+            term_counts = Counter(tokenize(text))
+            for term in tokenize(header):
+                term_counts[term] += HEADER_WEIGHT
+
+            for term, count in term_counts.items():
+                postings.setdefault(term, []).append([section_id, count])
+
+            lengths.append(sum(term_counts.values()))
+            sections.append({
+                'id': section_id,
+                'header_text': header,
+                'header_level': section.get('header_level'),
+                'text': text,
+            })
+
+        return cls(sections, postings, lengths, source)
+
+    def to_dict(self):
+        return {
+            'version': INDEX_VERSION,
+            'source': self.source,
+            'sections': self.sections,
+            'postings': self.postings,
+            'lengths': self.lengths,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['sections'], data['postings'], data['lengths'], data.get('source'))
+
+    def search(self, query, limit=10):
+        """Returns ranked [{id, header_text, header_level, score, snippet}] for the query."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.sections:
+            return []
+
+        total = len(self.sections)
+        scores = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for section_id, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[section_id] / self.avg_length)
+                scores[section_id] = scores.get(section_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        results = []
+        for section_id, score in ranked:
+            section = self.sections[section_id]
+            results.append({
+                'id': section_id,
+                'header_text': section['header_text'],
+                'header_level': section['header_level'],
+                'score': round(score, 4),
+                'snippet': make_snippet(section['text'] or section['header_text'], terms),
+            })
+        return results
+
+
+def make_snippet(text, terms):
+    """
+    Picks a SNIPPET_CHARS window around the first query term hit and wraps
+    every hit in <mark>. The text is HTML-escaped before highlighting.
+    """
+    pattern = re.compile(
+        r"(?<![\w-])(" + '|'.join(re.escape(term) for term in terms) + r")(?![\w-])",
+        re.IGNORECASE,
+    )
+    match = pattern.search(text)
+    start = 0
+    if match:
+        start = max(0, match.start() - SNIPPET_CHARS // 4)
+        # Don't start mid-word
+        space = text.rfind(' ', 0, start)
+        start = space + 1 if start and space != -1 else start
+    end = min(len(text), start + SNIPPET_CHARS)
+
+    parts = []
+    last = start
+    for hit in pattern.finditer(text, start, end):
+        parts.append(html.escape(text[last:hit.start()]))
+        parts.append(f'<mark>{html.escape(hit.group(0))}</mark>')
+        last = hit.end()
+    parts.append(html.escape(text[last:end]))
+
+    snippet = ''.join(parts)
+    if start > 0:
+        snippet = '…' + snippet
+    if end < len(text):
+        snippet += '…'
+    return snippet
+
+
+def get_index_path(abs_filepath, root_dir):
+    """Cache file named after the DOCX plus a hash of its path, so same-named documents don't collide."""
+    rel_path = os.path.relpath(abs_filepath, root_dir).replace(os.sep, '/')
+    digest = hashlib.sha1(os.path.normcase(rel_path).encode('utf-8')).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(abs_filepath))[0]
+    return os.path.join(root_dir, INDEX_CACHE_DIR, f"{name}-{digest}.index.json")
+
+
+def load_or_build_index(filepath, root_dir=None):
+    """
+    Returns the SectionIndex for a DOCX, from memory or the on-disk cache when
+    it still matches the file, otherwise by re-parsing the document.
+    filepath is resolved relative to root_dir, as in get_content_sections().
+    """
+    base_dir = root_dir or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    abs_filepath = os.path.join(base_dir, os.path.normpath(filepath))
+    if not os.path.exists(abs_filepath):
+        raise FileNotFoundError(f"Document file not found at: {abs_filepath}")
+
+    stat = os.stat(abs_filepath)
+
+    # 1. Memory: size + mtime unchanged means the file is unchanged
+    index = _INDEXES.get(abs_filepath)
+    if index and index.source.get('size') == stat.st_size and index.source.get('mtime_ns') == stat.st_mtime_ns:
+        return index
+
+    # 2. Disk: fall back to the content hash when only the mtime moved
+    stamp = file_stamp(abs_filepath)
+    index_path = get_index_path(abs_filepath, base_dir)
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION and data.get('source', {}).get('sha1') == stamp['sha1']:
+                index = SectionIndex.from_dict(data)
+                index.source = stamp
+                _INDEXES[abs_filepath] = index
+                return index
+        except (ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable search index {index_path}: {e}")
+
+    # 3. Rebuild from the document text
+    start = time.perf_counter()
+    sections = get_content_sections(filepath, root_dir=base_dir, include_images=False)
+    index = SectionIndex.build(sections, source=stamp)
+
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index.to_dict(), f, ensure_ascii=False)
+
+    logging.info(f"Built search index for {filepath}: {len(index.sections)} sections, "
+                 f"{len(index.postings)} terms in {time.perf_counter() - start:.3f}s")
+    _INDEXES[abs_filepath] = index
+    return index
+
+
+def search_document(filepath, query, root_dir=None, limit=10):
+    """Ranked section hits with highlighted snippets for a query against a DOCX."""
+    return load_or_build_index(filepath, root_dir).search(query, limit)
+
+
+if __name__ == '__main__':
+    # --- Benchmark: index build time and query latency ---
+    bench_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    bench_file = 'assets/NLP_IbaloiLanguage.docx'
+    bench_queries = ['ibaloi', 'lexicon columns', 'orthographic normalization', 'sentence builder website',
+                     'crowdsourcing', 'pronunciation', 'part of speech', 'scope limitations', 'kankanaey', 'a-aki']
+
+    start = time.perf_counter()
+    sections = get_content_sections(bench_file, root_dir=bench_root, include_images=False)
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = SectionIndex.build(sections)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = SectionIndex.from_dict(json.loads(json.dumps(index.to_dict())))
+    reload_seconds = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(200):
+        for query in bench_queries:
+            start = time.perf_counter()
+            index.search(query)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    print(f"\n--- Search index benchmark on {bench_file} ---")
+    print(f"Sections: {len(index.sections)}, terms: {len(index.postings)}")
+    print(f"DOCX parse (text only): {parse_seconds * 1000:.1f} ms")
+    print(f"Index build: {build_seconds * 1000:.2f} ms, JSON round-trip: {reload_seconds * 1000:.2f} ms")
+    print(f"Query latency over {len(latencies)} queries: "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.3f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms")
+    for hit in index.search('lexicon columns', limit=3):
+        print(f"  [{hit['id']}] {hit['header_text']} ({hit['score']}): {hit['snippet'][:100]}")
@@ -3,11 +3,15 @@ import re
 import os
 # REPLACE: Import Cerebras SDK instead of genai
 from cerebras.cloud.sdk import Cerebras
+from nlp_lib.translation_memory import TranslationMemory, APPROVED_PATH
 
 class IbaloiTranslator:
-    def __init__(self, csv_path='nlp_lib/FINAL-Ibaloi_LexiconWordCollection - Main Lexicon.csv', api_key=None):
+    def __init__(self, csv_path='nlp_lib/FINAL-Ibaloi_LexiconWordCollection - Main Lexicon.csv', api_key=None, approved_path=APPROVED_PATH):
+        self.csv_path = csv_path
         self.en_to_ib = {}
         self.ib_to_en = {}
+        # Example sentence pairs + admin-approved translations, answered without the LLM
+        self.translation_memory = TranslationMemory(approved_path=approved_path)
         
         # Configuration
         self.ENGLISH_STOPWORDS = {
@@ -45,29 +49,63 @@ class IbaloiTranslator:
             with open(path, mode='r', encoding='utf-8-sig') as file:
                 reader = csv.DictReader(file)
                 for row in reader:
-                    ibaloi_raw = row.get('Ibaloi_word', '').strip()
-                    english_raw = row.get('English_word', '').strip().lower()
-
-                    context_data = {}
-                    if row.get('POS', '').strip(): context_data['POS'] = row['POS'].strip()
-                    if row.get('Ibaloi_synonyms', '').strip(): context_data['Synonyms'] = row['Ibaloi_synonyms'].strip()
-                    if row.get('Ibaloi_sentence', '').strip(): context_data['Ibaloi_Example'] = row['Ibaloi_sentence'].strip()
-                    if row.get('English_sentence', '').strip(): context_data['English_Example'] = row['English_sentence'].strip()
-                    if row.get('Notes', '').strip(): context_data['Notes'] = row['Notes'].strip()
-
-                    if ibaloi_raw and english_raw:
-                        # English -> Ibaloi
-                        english_variants = [w.strip() for w in english_raw.split(',')]
-                        for eng_variant in english_variants:
-                            self.en_to_ib[eng_variant] = {'target': ibaloi_raw, **context_data}
-
-                        # Ibaloi -> English
-                        self.ib_to_en[ibaloi_raw.lower()] = {'target': english_raw, **context_data}
+                    self.add_entry(row)
             
             print("Lexicon loaded successfully.")
         except Exception as e:
             print(f"Error loading CSV: {e}")
 
+    def add_entry(self, row, memory=True):
+        """
+        Adds one lexicon CSV row to both lookup dictionaries.
+        Later rows overwrite earlier ones that share a word.
+        memory=False only rewrites the word lookups (the row's sentence pair is already counted).
+        """
+        ibaloi_raw = row.get('Ibaloi_word', '').strip()
+        english_raw = row.get('English_word', '').strip().lower()
+
+        context_data = {}
+        if row.get('POS', '').strip(): context_data['POS'] = row['POS'].strip()
+        if row.get('Ibaloi_synonyms', '').strip(): context_data['Synonyms'] = row['Ibaloi_synonyms'].strip()
+        if row.get('Ibaloi_sentence', '').strip(): context_data['Ibaloi_Example'] = row['Ibaloi_sentence'].strip()
+        if row.get('English_sentence', '').strip(): context_data['English_Example'] = row['English_sentence'].strip()
+        if row.get('Notes', '').strip(): context_data['Notes'] = row['Notes'].strip()
+
+        if ibaloi_raw and english_raw:
+            # English -> Ibaloi
+            english_variants = [w.strip() for w in english_raw.split(',')]
+            for eng_variant in english_variants:
+                self.en_to_ib[eng_variant] = {'target': ibaloi_raw, **context_data}
+
+            # Ibaloi -> English
+            self.ib_to_en[ibaloi_raw.lower()] = {'target': english_raw, **context_data}
+
+        if memory:
+            self.translation_memory.add_lexicon_row(row)
+
+    def remove_entry(self, row, memory=True):
+        """
+        Removes the lookups a lexicon CSV row created (only where that row still owns them).
+        Returns the Ibaloi and English keys touched, so other rows sharing them can be re-added.
+        """
+        ibaloi_raw = row.get('Ibaloi_word', '').strip()
+        english_raw = row.get('English_word', '').strip().lower()
+        ib_keys, en_keys = set(), set()
+
+        if ibaloi_raw and english_raw:
+            for eng_variant in [w.strip() for w in english_raw.split(',')]:
+                en_keys.add(eng_variant)
+                if self.en_to_ib.get(eng_variant, {}).get('target') == ibaloi_raw:
+                    del self.en_to_ib[eng_variant]
+
+            ib_keys.add(ibaloi_raw.lower())
+            if self.ib_to_en.get(ibaloi_raw.lower(), {}).get('target') == english_raw:
+                del self.ib_to_en[ibaloi_raw.lower()]
+
+        if memory:
+            self.translation_memory.remove_lexicon_row(row)
+        return ib_keys, en_keys
+
     def clean_token(self, token):
         """Removes punctuation from edges of words."""
         return re.sub(r'[^\w\s-]', '', token).lower()
@@ -88,7 +126,23 @@ class IbaloiTranslator:
         if not text:
             return {"error": "No text provided", "success": False}
 
+        return self.finish(self.prepare(text))
+
+    def prepare(self, text):
+        """
+        Lexicon-only half of translate(): direction, translation memory and word lookup.
+        Makes no network calls and returns a plain (picklable) dict for finish().
+        """
         direction = self.detect_direction(text)
+
+        # Step 0: Translation memory (exact or near-identical known sentence)
+        memory_hit = self.translation_memory.lookup(text)
+        similar = None
+        if memory_hit:
+            direction = memory_hit['direction']
+            if memory_hit['match'] == 'similar':
+                # Worded differently (e.g. an added "not"): a hint for the LLM, not an answer
+                similar, memory_hit = memory_hit, None
         
         # Configure based on direction
         if direction == 'en2ib':
@@ -114,8 +168,9 @@ class IbaloiTranslator:
                 translated_tokens.append(token) 
                 continue
 
-            if clean in lexicon:
-                entry = lexicon[clean]
+            # get(): a lexicon sync may swap the dictionaries while we read
+            entry = lexicon.get(clean)
+            if entry:
                 target_word = entry['target']
                 translated_tokens.append(target_word)
                 
@@ -139,15 +194,60 @@ class IbaloiTranslator:
                 breakdown_data.append({"word": token, "meaning": "???"})
                 has_missing_words = True
 
-        rough_translation = " ".join(translated_tokens)
-        context_block = "\n".join(found_context_strings)
+        if similar:
+            found_context_strings.append(
+                f"- Similar known translation (wording differs, similarity {similar['score']}): "
+                f"'{similar['source']}' -> '{similar['translation']}'"
+            )
+
+        return {
+            "text": text,
+            "direction": direction,
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "breakdown": breakdown_data,
+            "rough_translation": " ".join(translated_tokens),
+            "context_block": "\n".join(found_context_strings),
+            "has_missing_words": has_missing_words,
+            "memory_hit": memory_hit
+        }
+
+    def needs_refinement(self, prepared):
+        """True when finish() will call the LLM for this prepared input."""
+        return bool(self.client) and not prepared['memory_hit']
+
+    def finish(self, prepared):
+        """Second half of translate(): returns the memory hit or refines the rough translation."""
+        text = prepared['text']
+        direction = prepared['direction']
+        breakdown_data = prepared['breakdown']
+        rough_translation = prepared['rough_translation']
+        memory_hit = prepared['memory_hit']
+
+        if memory_hit:
+            return {
+                "success": True,
+                "original": text,
+                "translation": memory_hit['translation'],
+                "breakdown": breakdown_data,
+                "rough_translation": rough_translation,
+                "direction": direction,
+                "type": "translation_memory",
+                "memory": {
+                    "match": memory_hit['match'],
+                    "score": memory_hit['score'],
+                    "source": memory_hit['source'],
+                    "origin": memory_hit['origin']
+                }
+            }
 
         # Step 2: Refine with Cerebras AI
         final_translation = rough_translation 
         
         if self.client:
             final_translation = self.refine_with_cerebras(
-                rough_translation, text, source_lang, target_lang, has_missing_words, context_block
+                rough_translation, text, prepared['source_lang'], prepared['target_lang'],
+                prepared['has_missing_words'], prepared['context_block']
             )
 
         return {
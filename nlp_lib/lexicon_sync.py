@@ -0,0 +1,548 @@
+import os, io, csv, copy, json, time, hashlib, argparse, threading
+from datetime import datetime, timezone
+
+import requests
+
+# --- CONFIGURATION ---
+# Published CSV export of the crowdsourced sheet (same sheet the lexicon browser reads)
+SHEET_CSV_URL = "https://docs.google.com/spreadsheets/d/1iaKr-e3DG8S5fNR2ht1053DzqNSyV6dgbkj43_SMhdM/export?format=csv&gid=0"
+DEFAULT_CSV_PATH = 'nlp_lib/FINAL-Ibaloi_LexiconWordCollection - Main Lexicon.csv'
+# Flag column maintained by the builder; it is not part of a row's content hash
+NEW_FLAG_COLUMN = 'isNew'
+REQUEST_TIMEOUT = 30
+# Columns an upstream response must have to be treated as the lexicon
+REQUIRED_COLUMNS = ('Ibaloi_word', 'English_word')
+# A full sync deleting more than this fraction of rows is refused unless forced
+MAX_DELETE_FRACTION = 0.1
+# ---------------------
+
+
+class UpstreamError(ValueError):
+    """The sheet returned something that must not be merged (not the lexicon CSV, or a mass deletion)."""
+
+
+def row_key(ibaloi_word, occurrence):
+    """Stable row id: the Ibaloi headword plus its occurrence number (a few headwords repeat)."""
+    return f"{ibaloi_word.strip().lower()}#{occurrence}"
+
+
+def keyed_rows(rows):
+    """Returns an ordered {key: row} dict for a list of CSV rows."""
+    seen = {}
+    keyed = {}
+    for row in rows:
+        word = (row.get('Ibaloi_word') or '').strip().lower()
+        if not word:
+            continue
+        occurrence = seen.get(word, 0)
+        seen[word] = occurrence + 1
+        keyed[row_key(word, occurrence)] = row
+    return keyed
+
+
+def row_hash(row, fieldnames):
+    content = '\x1f'.join((row.get(name) or '').strip() for name in fieldnames if name != NEW_FLAG_COLUMN)
+    # Multi-line cells may come back with either line ending
+    content = content.replace('\r\n', '\n')
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def is_new(row):
+    return (row.get(NEW_FLAG_COLUMN) or '').strip().upper() == 'TRUE'
+
+
+def row_words(row):
+    """The Ibaloi and English lookup keys a row creates in IbaloiTranslator."""
+    ibaloi = (row.get('Ibaloi_word') or '').strip()
+    english = (row.get('English_word') or '').strip().lower()
+    if not ibaloi or not english:
+        return set(), set()
+    return {ibaloi.lower()}, {w.strip() for w in english.split(',')}
+
+
+def read_csv_rows(text):
+    reader = csv.DictReader(io.StringIO(text.lstrip('﻿')))
+    return reader.fieldnames or [], list(reader)
+
+
+class LexiconSync:
+    """
+    Incrementally syncs the crowdsourced sheet into the on-disk lexicon CSV and,
+    optionally, a live IbaloiTranslator.
+
+    Each row is identified by row_key() and fingerprinted with a content hash.
+    A sync diffs the upstream rows against the stored hashes and only touches
+    rows that were added, updated or deleted. State lives next to the CSV:
+      <csv>.sync.json       - version, HTTP validators, row hashes
+      <csv>.changelog.jsonl - one line per version with the row changes
+    """
+
+    def __init__(self, csv_path=DEFAULT_CSV_PATH, source_url=SHEET_CSV_URL, translator=None):
+        self.csv_path = csv_path
+        self.source_url = source_url
+        self.translator = translator
+        self.state_path = f"{os.path.splitext(csv_path)[0]}.sync.json"
+        self.changelog_path = f"{os.path.splitext(csv_path)[0]}.changelog.jsonl"
+        # lock guards what readers see (rows, version); sync_lock runs one sync at a time
+        self.lock = threading.Lock()
+        self.sync_lock = threading.RLock()
+        self.last_sync = None
+
+        self.fieldnames, self.rows = self.load_local()
+        self.state = self.load_state()
+
+        self.word_rows = {}
+        for key, row in self.rows.items():
+            self.index_words(key, row)
+
+    # --- Local state ---
+
+    def load_local(self):
+        """Reads the on-disk lexicon into (fieldnames, {key: row})."""
+        self.line_terminator = '\r\n'  # Google Sheets CSV exports use CRLF
+        if not os.path.exists(self.csv_path):
+            return [], {}
+        with open(self.csv_path, mode='r', encoding='utf-8-sig', newline='') as file:
+            text = file.read()
+        if '\n' in text and '\r\n' not in text:
+            self.line_terminator = '\n'
+        fieldnames, rows = read_csv_rows(text)
+        return fieldnames, keyed_rows(rows)
+
+    def load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        # First run: the current CSV is version 0
+        return {
+            'version': 0,
+            'etag': None,
+            'last_modified': None,
+            'hashes': {key: row_hash(row, self.fieldnames) for key, row in self.rows.items()},
+        }
+
+    def write_atomic(self, path, write):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as file:
+            write(file)
+        os.replace(tmp_path, path)
+
+    def save_local(self):
+        def write(file):
+            writer = csv.DictWriter(file, fieldnames=self.fieldnames, lineterminator=self.line_terminator, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(self.rows.values())
+        self.write_atomic(self.csv_path, write)
+
+    def save_state(self):
+        self.write_atomic(self.state_path, lambda file: json.dump(self.state, file))
+
+    # --- Upstream ---
+
+    def fetch(self, new_only=False):
+        """
+        Downloads the upstream CSV. Sends the stored ETag/Last-Modified so an
+        unchanged sheet costs a 304 and no parsing. Returns None when unchanged,
+        otherwise (fieldnames, rows, validators); the validators are only stored
+        once the response has been accepted.
+        Raises UpstreamError when the body is not the lexicon CSV (e.g. a sign-in page).
+        """
+        headers = {}
+        params = {}
+        if self.state.get('etag'):
+            headers['If-None-Match'] = self.state['etag']
+        if self.state.get('last_modified'):
+            headers['If-Modified-Since'] = self.state['last_modified']
+        if new_only:
+            # Honoured by endpoints that can filter (e.g. the Apps Script proxy); filtered locally anyway
+            params[NEW_FLAG_COLUMN] = 'TRUE'
+
+        response = requests.get(self.source_url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+
+        fieldnames, rows = read_csv_rows(response.text)
+        missing = [name for name in REQUIRED_COLUMNS if name not in fieldnames]
+        if missing:
+            raise UpstreamError(f"Upstream response is not the lexicon CSV (missing columns {missing}; "
+                                f"Content-Type {response.headers.get('Content-Type')!r})")
+        # A filtered new-only listing may legitimately be empty
+        if not new_only and not keyed_rows(rows):
+            raise UpstreamError("Upstream lexicon CSV has no rows")
+
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+        return fieldnames, rows, validators
+
+    # --- Diff & merge ---
+
+    def diff(self, fieldnames, upstream_rows, new_only=False):
+        """
+        Compares upstream rows with the stored hashes.
+        In new_only mode only rows flagged isNew are considered and deletions
+        are not detected (the upstream listing is partial).
+        """
+        hashes = self.state['hashes']
+        upstream = keyed_rows(upstream_rows)
+        added, updated, deleted = [], [], []
+
+        for key, row in upstream.items():
+            if new_only and not is_new(row):
+                continue
+            digest = row_hash(row, fieldnames)
+            if key not in hashes:
+                added.append((key, row, digest))
+            elif hashes[key] != digest:
+                updated.append((key, row, digest))
+
+        if not new_only:
+            deleted = [key for key in hashes if key not in upstream]
+
+        return added, updated, deleted
+
+    def apply(self, fieldnames, added, updated, deleted, upstream_keys=None, new_only=False):
+        """
+        Merges a diff into the on-disk rows and the translator's lookup dictionaries.
+        upstream_keys (the upstream rows' keys in sheet order) keeps self.rows in
+        sheet order, so "later rows win" matches a full load for mid-sheet inserts.
+        """
+        for name in fieldnames:
+            if name not in self.fieldnames:
+                self.fieldnames.append(name)
+
+        old_rows = [self.rows[key] for key, _, _ in updated if key in self.rows]
+        old_rows += [self.rows[key] for key in deleted if key in self.rows]
+
+        for key in [k for k, _, _ in updated] + deleted:
+            if key in self.rows:
+                self.index_words(key, self.rows[key], add=False)
+        for key, row, digest in added + updated:
+            self.rows[key] = row
+            self.state['hashes'][key] = digest
+            self.index_words(key, row)
+        for key in deleted:
+            self.rows.pop(key, None)
+            self.state['hashes'].pop(key, None)
+        if upstream_keys is not None:
+            self.reorder(upstream_keys, {key for key, _, _ in added}, new_only)
+
+        if self.translator is not None:
+            self.merge_into_translator(old_rows, [row for _, row, _ in added + updated])
+
+    def reorder(self, upstream_keys, added_keys, new_only):
+        """
+        Rebuilds self.rows in upstream order. A new-only listing is partial, so
+        there each added row goes next to its nearest neighbour in the listing
+        that is already local, and the other local rows keep their order.
+        """
+        if not new_only:
+            self.rows = {key: self.rows[key] for key in upstream_keys if key in self.rows}
+            return
+        # Added rows ahead of the first local row go before it; the rest follow their predecessor
+        before, after = {}, {}
+        previous, leading = None, []
+        for key in upstream_keys:
+            if key in added_keys:
+                if previous is None:
+                    leading.append(key)
+                else:
+                    after.setdefault(previous, []).append(key)
+            elif key in self.rows:
+                if previous is None:
+                    before[key] = leading
+                previous = key
+        rows = {}
+        for key, row in self.rows.items():
+            if key not in added_keys:
+                rows.update((new_key, self.rows[new_key]) for new_key in before.get(key, ()))
+                rows[key] = row
+                rows.update((new_key, self.rows[new_key]) for new_key in after.get(key, ()))
+        if previous is None:
+            rows.update((key, self.rows[key]) for key in leading)
+        self.rows = rows
+
+    def index_words(self, key, row, add=True):
+        """Keeps word -> row keys in step with self.rows, so merges only visit rows that share a word."""
+        ib, en = row_words(row)
+        for word in [('ib', w) for w in ib] + [('en', w) for w in en]:
+            keys = self.word_rows.setdefault(word, set())
+            if add:
+                keys.add(key)
+            else:
+                keys.discard(key)
+
+    def merge_into_translator(self, old_rows, new_rows):
+        """
+        Drops the old versions of changed rows, then re-adds, in file order, every
+        row sharing a word with a changed row. Later rows win, exactly as in a
+        full load_lexicon(), without rebuilding the whole dictionary.
+        The translation memory is reference-counted per row, so only the changed
+        rows touch it (including rows without an English_word).
+
+        The word lookups are edited on copies that are swapped in at the end, so
+        translate() calls running on other threads never see a half-applied merge.
+        """
+        staged = copy.copy(self.translator)
+        staged.en_to_ib = dict(self.translator.en_to_ib)
+        staged.ib_to_en = dict(self.translator.ib_to_en)
+
+        pending = []
+        for row in old_rows:
+            ib, en = staged.remove_entry(row, memory=False)
+            pending += [('ib', w) for w in ib] + [('en', w) for w in en]
+        for row in new_rows:
+            ib, en = row_words(row)
+            pending += [('ib', w) for w in ib] + [('en', w) for w in en]
+
+        # A re-added row rewrites all of its words, so those words need every
+        # other row that shares them re-added too: walk to a closure.
+        seen_words = set()
+        row_keys = set()
+        while pending:
+            word = pending.pop()
+            if word in seen_words:
+                continue
+            seen_words.add(word)
+            for key in self.word_rows.get(word, ()):
+                if key not in row_keys:
+                    row_keys.add(key)
+                    ib, en = row_words(self.rows[key])
+                    pending += [('ib', w) for w in ib] + [('en', w) for w in en]
+
+        position = {key: i for i, key in enumerate(self.rows)}
+        for key in sorted(row_keys, key=position.__getitem__):
+            staged.add_entry(self.rows[key], memory=False)
+
+        self.translator.en_to_ib = staged.en_to_ib
+        self.translator.ib_to_en = staged.ib_to_en
+
+        memory = self.translator.translation_memory
+        for row in old_rows:
+            memory.remove_lexicon_row(row)
+        for row in new_rows:
+            memory.add_lexicon_row(row)
+
+    def log_changes(self, version, added, updated, deleted, old_rows):
+        entry = {
+            'version': version,
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'added': [{'key': key, 'row': row} for key, row, _ in added],
+            'updated': [{'key': key, 'row': row, 'old': old_rows.get(key)} for key, row, _ in updated],
+            'deleted': [{'key': key, 'old': old_rows.get(key)} for key in deleted],
+        }
+        with open(self.changelog_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def sync(self, new_only=False, force=False):
+        """
+        Runs one sync. Returns a summary dict:
+        {"version", "changed", "added", "updated", "deleted", "seconds", "phases"}
+        where phases holds the fetch/diff/merge/persist split in seconds.
+        Raises UpstreamError, leaving the data untouched, for a bad upstream
+        response or a sync deleting more than MAX_DELETE_FRACTION of the rows
+        (pass force=True to accept such a deletion).
+        Readers only wait for the diff and merge, never for the download.
+        """
+        with self.sync_lock:
+            phases = {}
+            start = time.perf_counter()
+            fetched = self.fetch(new_only=new_only)
+            phases['fetch'] = time.perf_counter() - start
+            added, updated, deleted = [], [], []
+
+            with self.lock:
+                if fetched is not None:
+                    fieldnames, upstream_rows, validators = fetched
+                    added, updated, deleted = self.diff(fieldnames, upstream_rows, new_only=new_only)
+                    if not force and len(deleted) > MAX_DELETE_FRACTION * len(self.state['hashes']):
+                        raise UpstreamError(f"Sync would delete {len(deleted)} of {len(self.state['hashes'])} rows; "
+                                            f"refusing without force")
+                    self.state.update(validators)
+                phases['diff'] = time.perf_counter() - start - phases['fetch']
+
+                if added or updated or deleted:
+                    old_rows = {key: self.rows.get(key) for key in [k for k, _, _ in updated] + deleted}
+                    self.apply(fieldnames, added, updated, deleted,
+                               upstream_keys=list(keyed_rows(upstream_rows)), new_only=new_only)
+                    phases['merge'] = time.perf_counter() - start - phases['fetch'] - phases['diff']
+
+            # Only syncs change rows and state, and sync_lock keeps them out while we write
+            if added or updated or deleted:
+                self.save_local()
+                self.log_changes(self.state['version'] + 1, added, updated, deleted, old_rows)
+                # Publish the version once its changelog entry exists
+                with self.lock:
+                    self.state['version'] += 1
+
+            # Persist HTTP validators even when nothing changed
+            if fetched is not None:
+                self.save_state()
+
+            self.last_sync = time.monotonic()
+            elapsed = time.perf_counter() - start
+            phases['persist'] = elapsed - sum(phases.values())
+            return {
+                'version': self.state['version'],
+                'changed': bool(added or updated or deleted),
+                'added': len(added),
+                'updated': len(updated),
+                'deleted': len(deleted),
+                'seconds': round(elapsed, 4),
+                'phases': {name: round(seconds, 4) for name, seconds in phases.items()},
+            }
+
+    def sync_if_stale(self, max_age):
+        """Syncs when the last sync is older than max_age seconds; upstream errors keep the current data."""
+        with self.sync_lock:
+            # Checked under sync_lock so a sync that just finished is not repeated
+            if self.last_sync is not None and time.monotonic() - self.last_sync < max_age:
+                return None
+            try:
+                return self.sync()
+            except (requests.RequestException, UpstreamError) as e:
+                print(f"Lexicon sync failed: {e}")
+                self.last_sync = time.monotonic()
+                return None
+
+    def start_background_sync(self, interval):
+        """Syncs every `interval` seconds on a daemon thread, so lexicon reads never wait on the sheet."""
+        def run():
+            while True:
+                try:
+                    self.sync_if_stale(interval)
+                except Exception as e:
+                    print(f"Lexicon sync failed: {e}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name='lexicon-sync', daemon=True)
+        thread.start()
+        return thread
+
+    def snapshot(self):
+        """Current version, column names and (key, row) pairs in file order."""
+        with self.lock:
+            return self.state['version'], list(self.fieldnames), list(self.rows.items())
+
+    def changes_since(self, version):
+        """Changelog entries newer than `version`, oldest first."""
+        entries = []
+        if os.path.exists(self.changelog_path):
+            with open(self.changelog_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    entry = json.loads(line)
+                    if entry['version'] > version:
+                        entries.append(entry)
+        return entries
+
+
+# --- Local stub of the upstream sheet (for testing and benchmarking) ---
+
+def serve_stub_sheet(csv_text_ref, port=0):
+    """
+    Serves csv_text_ref['text'] as the sheet's CSV export with an ETag, so
+    sync() can be exercised without Google. Returns (server, url).
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class SheetHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            body = csv_text_ref['text'].encode('utf-8')
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), SheetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/export"
+
+
+def benchmark(csv_path=DEFAULT_CSV_PATH, edits=20):
+    """Times an incremental sync of `edits` adds/updates/deletes against a full rebuild."""
+    import shutil, tempfile
+    from nlp_lib.gen_lex import IbaloiTranslator
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        local_csv = os.path.join(work_dir, 'lexicon.csv')
+        shutil.copy(csv_path, local_csv)
+        with open(local_csv, 'r', encoding='utf-8-sig') as file:
+            fieldnames, rows = read_csv_rows(file.read())
+
+        # Upstream = local with some rows edited, some removed and some new ones
+        upstream = [dict(row) for row in rows]
+        for row in upstream[:edits]:
+            row['Notes'] = (row.get('Notes') or '') + ' (revised)'
+        del upstream[edits:edits * 2]
+        for i in range(edits):
+            upstream.append({**upstream[0], 'Ibaloi_word': f'bagong-salita-{i}', 'English_word': f'new word {i}', 'isNew': 'TRUE'})
+        # Mid-sheet inserts sharing an English word with a later row: the later row must still win
+        later = [row for row in upstream[edits * 4:] if (row.get('English_word') or '').strip()]
+        for i, row in enumerate(later[:edits // 4]):
+            upstream.insert(5 + i, {**row, 'Ibaloi_word': f'zzz-nakasingit-{i}', 'isNew': 'TRUE'})
+
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=fieldnames, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(upstream)
+        sheet = {'text': out.getvalue()}
+        server, url = serve_stub_sheet(sheet)
+
+        translator = IbaloiTranslator(csv_path=local_csv, api_key='')
+        syncer = LexiconSync(csv_path=local_csv, source_url=url, translator=translator)
+
+        result = syncer.sync()
+        unchanged = syncer.sync()
+
+        start = time.perf_counter()
+        response = requests.get(url, timeout=REQUEST_TIMEOUT)
+        fetch_seconds = time.perf_counter() - start
+        full_csv = os.path.join(work_dir, 'full.csv')
+        with open(full_csv, 'w', encoding='utf-8') as file:
+            file.write(response.text)
+        start = time.perf_counter()
+        rebuilt = IbaloiTranslator(csv_path=full_csv, api_key='')
+        load_seconds = time.perf_counter() - start
+        server.shutdown()
+
+        consistent = rebuilt.en_to_ib == translator.en_to_ib and rebuilt.ib_to_en == translator.ib_to_en
+        print(f"\n--- Lexicon sync benchmark ({len(rows)} rows, {edits} adds/updates/deletes) ---")
+        print(f"Incremental sync: {result['seconds'] * 1000:.1f} ms "
+              f"(+{result['added']} ~{result['updated']} -{result['deleted']}, version {result['version']})")
+        print("  phases: " + ', '.join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in result['phases'].items()))
+        print(f"Unchanged sheet (304): {unchanged['seconds'] * 1000:.1f} ms")
+        print(f"Full rebuild: {(fetch_seconds + load_seconds) * 1000:.1f} ms "
+              f"(fetch {fetch_seconds * 1000:.1f} ms, load_lexicon {load_seconds * 1000:.1f} ms)")
+        print(f"In-memory indexes match full rebuild: {consistent}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incrementally sync the lexicon CSV from the crowdsourced sheet')
+    parser.add_argument('--csv', default=DEFAULT_CSV_PATH, help='On-disk lexicon CSV to update')
+    parser.add_argument('--url', default=SHEET_CSV_URL, help='Upstream CSV endpoint')
+    parser.add_argument('--new-only', action='store_true', help='Only merge rows flagged isNew (no deletions)')
+    parser.add_argument('--force', action='store_true',
+                        help=f'Accept a sync deleting more than {MAX_DELETE_FRACTION:.0%} of the rows')
+    parser.add_argument('--bench', action='store_true', help='Benchmark against a local stub of the sheet')
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.csv)
+    else:
+        print(json.dumps(LexiconSync(csv_path=args.csv, source_url=args.url).sync(new_only=args.new_only, force=args.force)))
@@ -0,0 +1,373 @@
+import os, re, csv, json, time, zlib, hashlib, random, argparse, unicodedata
+
+# --- CONFIGURATION ---
+APPROVED_PATH = 'nlp_lib/approved_translations.jsonl'
+# Minimum similarity (0-1) for a similar sentence to be passed to the LLM as context
+FUZZY_THRESHOLD = 0.85
+# A fuzzy match is only answered without the LLM when both sentences have the same
+# words in the same order, each within a typo's edit distance: none below
+# TYPO_MIN_LENGTH letters (so "go"/"no" differ), 2 from TYPO_LONG_LENGTH letters,
+# and at most 1 in TYPO_WORDS_PER words differs at all.
+TYPO_MIN_LENGTH = 5
+TYPO_LONG_LENGTH = 9
+TYPO_WORDS_PER = 4
+CHAR_NGRAM = 3
+# MinHash signature = BANDS * ROWS values; LSH candidates share at least one band.
+# 10 x 3 makes pairs with a char n-gram Jaccard of 0.6 candidates ~90% of the time.
+MINHASH_BANDS = 10
+MINHASH_ROWS = 3
+# Weight of the char n-gram Jaccard vs the token Jaccard in the final score
+CHAR_WEIGHT = 0.7
+# ---------------------
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+
+def normalize(text):
+    """Case/punctuation/whitespace-insensitive form used for hashing and shingling."""
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = re.sub(r"[^\w\s'-]", ' ', text)
+    text = re.sub(r"(?<!\w)['-]|['-](?!\w)", ' ', text)
+    return ' '.join(text.split())
+
+
+def char_ngrams(norm):
+    padded = f" {norm} "
+    if len(padded) <= CHAR_NGRAM:
+        return {padded}
+    return {padded[i:i + CHAR_NGRAM] for i in range(len(padded) - CHAR_NGRAM + 1)}
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance with adjacent transpositions, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def typo_edits(query_words, known_words):
+    """
+    Total edits when the query is the known sentence with only typos, else None.
+    Word insertions, deletions and substitutions (e.g. an added "not") never qualify.
+    """
+    if len(query_words) != len(known_words):
+        return None
+    total, changed = 0, 0
+    for query_word, known_word in zip(query_words, known_words):
+        if query_word == known_word:
+            continue
+        length = len(known_word)
+        limit = 2 if length >= TYPO_LONG_LENGTH else 1 if length >= TYPO_MIN_LENGTH else 0
+        distance = edit_distance(query_word, known_word, limit)
+        if distance > limit:
+            return None
+        total += distance
+        changed += 1
+    if changed > max(1, len(known_words) // TYPO_WORDS_PER):
+        return None
+    return total
+
+
+def minhash(shingles):
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def lsh_bands(signature):
+    for band in range(MINHASH_BANDS):
+        yield band, tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])
+
+
+class TranslationMemory:
+    """
+    Sentence-level translation memory over the lexicon's example sentence pairs
+    and admin-approved translations.
+
+    Lookups try an exact match on the normalized sentence hash first, then a
+    fuzzy match: MinHash/LSH over character n-grams finds candidates, which are
+    scored by char n-gram and token Jaccard similarity.
+    """
+
+    def __init__(self, approved_path=APPROVED_PATH, threshold=FUZZY_THRESHOLD):
+        self.approved_path = approved_path
+        self.threshold = threshold
+        self.entries = []
+        self.exact = {}
+        self.buckets = {}
+        self.load_approved()
+
+    def add(self, source, target, direction, origin='lexicon'):
+        """
+        Indexes one source->target pair. direction is 'ib2en' or 'en2ib'.
+        Pairs are reference-counted: each lexicon row (or approval) supplying
+        the same pair adds a reference, and remove() drops one.
+        """
+        source, target = source.strip(), target.strip()
+        norm = normalize(source)
+        if not norm or not target:
+            return
+
+        digest = hashlib.sha1(norm.encode('utf-8')).hexdigest()
+        for index in self.exact.get(digest, []):
+            entry = self.entries[index]
+            if entry['direction'] == direction and entry['origin'] == origin and entry['target'] == target:
+                entry['refs'] += 1
+                if origin == 'approved':
+                    # Re-approving an older translation makes it the current one again
+                    entry['order'] = len(self.entries)
+                self.select(digest, direction)
+                return
+
+        shingles = char_ngrams(norm)
+        index = len(self.entries)
+        self.entries.append({
+            'source': source,
+            'target': target,
+            'direction': direction,
+            'origin': origin,
+            'refs': 1,
+            'order': index,
+            'active': False,
+            'shingles': shingles,
+            'tokens': set(norm.split()),
+            'words': norm.split(),
+        })
+        self.exact.setdefault(digest, []).append(index)
+        for band in lsh_bands(minhash(shingles)):
+            self.buckets.setdefault(band, []).append(index)
+        self.select(digest, direction)
+
+    def remove(self, source, target, direction, origin='lexicon'):
+        """Drops one reference to a pair (e.g. its lexicon row was deleted upstream)."""
+        digest = hashlib.sha1(normalize(source).encode('utf-8')).hexdigest()
+        for index in self.exact.get(digest, []):
+            entry = self.entries[index]
+            if entry['direction'] == direction and entry['origin'] == origin and entry['target'] == target.strip():
+                entry['refs'] = max(0, entry['refs'] - 1)
+                self.select(digest, direction)
+                return
+
+    def select(self, digest, direction):
+        """
+        Activates the one pair that answers a sentence in a direction: the latest
+        approved translation, otherwise the first-added lexicon pair still referenced.
+        """
+        candidates = [self.entries[i] for i in self.exact.get(digest, []) if self.entries[i]['direction'] == direction]
+        live = [entry for entry in candidates if entry['refs'] > 0]
+        approved = [entry for entry in live if entry['origin'] == 'approved']
+        winner = max(approved, key=lambda e: e['order']) if approved else min(live, key=lambda e: e['order'], default=None)
+        for entry in candidates:
+            entry['active'] = entry is winner
+
+    def add_lexicon_row(self, row):
+        """Adds the Ibaloi_sentence/English_sentence pair of a lexicon CSV row in both directions."""
+        ibaloi = (row.get('Ibaloi_sentence') or '').strip()
+        english = (row.get('English_sentence') or '').strip()
+        if ibaloi and english:
+            self.add(ibaloi, english, 'ib2en')
+            self.add(english, ibaloi, 'en2ib')
+
+    def remove_lexicon_row(self, row):
+        ibaloi = (row.get('Ibaloi_sentence') or '').strip()
+        english = (row.get('English_sentence') or '').strip()
+        if ibaloi and english:
+            self.remove(ibaloi, english, 'ib2en')
+            self.remove(english, ibaloi, 'en2ib')
+
+    def load_approved(self):
+        if not os.path.exists(self.approved_path):
+            return
+        with open(self.approved_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    item = json.loads(line)
+                    self.add(item['source'], item['translation'], item['direction'], origin='approved')
+
+    def approve(self, source, translation, direction):
+        """Stores an admin-approved translation and makes it available immediately."""
+        with open(self.approved_path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'source': source, 'translation': translation, 'direction': direction}, ensure_ascii=False) + '\n')
+        self.add(source, translation, direction, origin='approved')
+
+    def lookup(self, text, direction=None):
+        """
+        Returns the best match, or None:
+        {"translation", "source", "direction", "origin", "match", "score"}.
+        match is "exact" (same normalized sentence), "fuzzy" (same words up to
+        typos, see typo_edits) or "similar" (scores at least the threshold but
+        differs in wording). Only exact and fuzzy matches are safe to answer
+        with directly; a similar match is context for the LLM.
+        direction restricts the search to one language pair.
+        """
+        norm = normalize(text)
+        if not norm:
+            return None
+
+        digest = hashlib.sha1(norm.encode('utf-8')).hexdigest()
+        exact = [self.entries[i] for i in self.exact.get(digest, []) if self.entries[i]['active']]
+        if direction:
+            exact = [entry for entry in exact if entry['direction'] == direction]
+        if exact:
+            # select() keeps at most one active pair per sentence and direction
+            return self.make_result(exact[0], 'exact', 1.0)
+
+        shingles = char_ngrams(norm)
+        tokens = set(norm.split())
+        words = norm.split()
+        candidates = set()
+        for band in lsh_bands(minhash(shingles)):
+            candidates.update(self.buckets.get(band, ()))
+
+        typo, typo_key = None, None
+        best, best_score = None, 0.0
+        for index in candidates:
+            entry = self.entries[index]
+            if not entry['active'] or (direction and entry['direction'] != direction):
+                continue
+            score = CHAR_WEIGHT * jaccard(shingles, entry['shingles']) + (1 - CHAR_WEIGHT) * jaccard(tokens, entry['tokens'])
+            edits = typo_edits(words, entry['words'])
+            if edits is not None and (typo_key is None or (edits, -score) < typo_key):
+                typo, typo_key = entry, (edits, -score)
+            if score > best_score:
+                best, best_score = entry, score
+
+        if typo is not None:
+            return self.make_result(typo, 'fuzzy', -typo_key[1])
+        if best is not None and best_score >= self.threshold:
+            return self.make_result(best, 'similar', best_score)
+        return None
+
+    def make_result(self, entry, match, score):
+        return {
+            'translation': entry['target'],
+            'source': entry['source'],
+            'direction': entry['direction'],
+            'origin': entry['origin'],
+            'match': match,
+            'score': round(score, 4),
+        }
+
+    def __len__(self):
+        return sum(1 for entry in self.entries if entry['active'])
+
+
+def perturb(text, rng):
+    """Near-duplicate of a sentence: different casing/punctuation, sometimes a dropped or doubled letter."""
+    text = text.lower().rstrip('.?!') if rng.random() < 0.5 else text.upper()
+    words = text.split()
+    if len(words) > 2 and rng.random() < 0.5:
+        i = rng.randrange(len(words))
+        word = words[i]
+        if len(word) > 3:
+            j = rng.randrange(1, len(word) - 1)
+            words[i] = word[:j] + word[j + 1:] if rng.random() < 0.5 else word[:j] + word[j] + word[j:]
+    return ' '.join(words)
+
+
+def reword(text, rng, vocabulary):
+    """Same sentence with a different meaning: one word inserted or substituted from vocabulary."""
+    words = text.split()
+    word = rng.choice(vocabulary)
+    if rng.random() < 0.5:
+        words.insert(rng.randrange(1, len(words) + 1), word)
+    else:
+        i = rng.randrange(len(words))
+        while normalize(word) == normalize(words[i]):
+            word = rng.choice(vocabulary)
+        words[i] = word
+    return ' '.join(words)
+
+
+if __name__ == '__main__':
+    # --- Benchmark: hit rate, fuzzy precision and LLM latency saved on the evaluation set ---
+    parser = argparse.ArgumentParser(description='Translation memory hit rate on ibaloi-evaluation.csv')
+    parser.add_argument('--lexicon', default='nlp_lib/FINAL-Ibaloi_LexiconWordCollection - Main Lexicon.csv')
+    parser.add_argument('--eval', default='ibaloi-evaluation.csv')
+    parser.add_argument('--llm-latency', type=float, default=1.5,
+                        help='Seconds per LLM refinement call assumed when estimating time saved')
+    args = parser.parse_args()
+
+    with open(args.eval, 'r', encoding='utf-8-sig') as file:
+        eval_rows = list(csv.DictReader(file))
+    rng = random.Random(7)
+    rng.shuffle(eval_rows)
+    approved_rows, held_out_rows = eval_rows[:len(eval_rows) // 2], eval_rows[len(eval_rows) // 2:]
+
+    def pairs(rows):
+        items = [(row['source_text'], row['target_text'], 'ib2en') for row in rows]
+        return items + [(row['target_text'], row['source_text'], 'en2ib') for row in rows]
+
+    def run(memory, items, label, meaning_changed=False):
+        """
+        Answered = exact + fuzzy hits (skip the LLM); similar matches only become LLM context.
+        When meaning_changed, the known translation is wrong by construction, so every answer is a false hit.
+        """
+        hits, correct, latencies = {'exact': 0, 'fuzzy': 0, 'similar': 0}, {'exact': 0, 'fuzzy': 0}, []
+        for source, expected, direction in items:
+            start = time.perf_counter()
+            result = memory.lookup(source, direction)
+            latencies.append(time.perf_counter() - start)
+            if result:
+                hits[result['match']] += 1
+                if result['match'] != 'similar' and not meaning_changed:
+                    correct[result['match']] += normalize(result['translation']) == normalize(expected)
+        latencies.sort()
+        answered = hits['exact'] + hits['fuzzy']
+        print(f"--- {label} ---")
+        print(f"Answered from memory: {answered}/{len(items)} ({answered / len(items):.1%}; "
+              f"exact {hits['exact']}, fuzzy {hits['fuzzy']}), passed to LLM as context: {hits['similar']}")
+        print(f"Correct answers: exact {correct['exact']}/{hits['exact']}, fuzzy {correct['fuzzy']}/{hits['fuzzy']}")
+        print(f"Lookup latency: p50 {latencies[len(latencies) // 2] * 1000:.3f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.3f} ms")
+        print(f"LLM time saved: ~{answered * args.llm_latency:.1f}s over {len(items)} requests "
+              f"(at {args.llm_latency}s per refinement)")
+        return hits['fuzzy'], correct['fuzzy']
+
+    # 1. Cold: only the lexicon example pairs
+    memory = TranslationMemory(approved_path=os.devnull)
+    start = time.perf_counter()
+    with open(args.lexicon, 'r', encoding='utf-8-sig') as file:
+        for row in csv.DictReader(file):
+            memory.add_lexicon_row(row)
+    print(f"\nBuilt translation memory: {len(memory)} pairs in {(time.perf_counter() - start) * 1000:.1f} ms")
+    run(memory, pairs(eval_rows), 'Lexicon example pairs only')
+
+    # 2. Warm: half the evaluation pairs approved by an admin; the other half is never seen
+    approved = pairs(approved_rows)
+    for source, expected, direction in approved:
+        memory.add(source, expected, direction, origin='approved')
+    print(f"\nApproved {len(approved)} evaluation pairs; {len(held_out_rows) * 2} held out")
+    run(memory, pairs(held_out_rows), 'Held-out sentences (not approved)')
+
+    # 3. Requests close to an approved sentence: typos should be answered, rewordings must not be
+    fuzzy_hits, fuzzy_correct = run(memory, [(perturb(s, rng), e, d) for s, e, d in approved],
+                                    'Typo variants of approved sentences (case/punctuation/letter)')
+    vocabulary = {direction: [word for s, _, d in approved if d == direction for word in s.split()]
+                  for direction in ('ib2en', 'en2ib')}
+    reworded = [(reword(s, rng, vocabulary[d]), e, d) for s, e, d in approved]
+    false_hits, _ = run(memory, reworded, 'Reworded approved sentences (word inserted or substituted)',
+                        meaning_changed=True)
+    fuzzy_hits += false_hits
+    print(f"\nFuzzy precision: {fuzzy_correct}/{fuzzy_hits} "
+          f"({fuzzy_correct / (fuzzy_hits or 1):.1%}; {false_hits} reworded sentences answered as fuzzy)")
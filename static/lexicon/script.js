@@ -7,9 +7,13 @@ let currentSort = { column: null, direction: null };
 let currentPage = 1;
 const rowsPerPage = 50;
 let columnNames = [];
+let lexiconVersion = null;      // Server lexicon version (null = loaded straight from the sheet)
+const rowsByKey = new Map();    // Server row key -> row object in fullData
 
-// Google Sheets CSV Link
+// Google Sheets CSV Link (fallback when the server lexicon API is unavailable)
 const CSV_URL = "https://docs.google.com/spreadsheets/d/1iaKr-e3DG8S5fNR2ht1053DzqNSyV6dgbkj43_SMhdM/export?format=csv&gid=0";
+// Server copy of the sheet, kept in sync incrementally (see nlp_lib/lexicon_sync.py)
+const LEXICON_API = "/api/lexicon";
 
 // Initialize Icons
 if (typeof feather !== 'undefined') {
@@ -54,11 +58,31 @@ function parseCSV(csvText) {
     return { headers, rows };
 }
 
+async function loadLexicon() {
+    // Prefer the server's synced copy; it supports incremental refreshes
+    try {
+        const response = await fetch(LEXICON_API, { cache: "no-store" });
+        if (!response.ok) throw new Error("Lexicon API error: " + response.status);
+        const data = await response.json();
+
+        rowsByKey.clear();
+        const rows = data.rows.map(({ key, row }) => {
+            rowsByKey.set(key, row);
+            return row;
+        });
+        lexiconVersion = data.version;
+        return { headers: data.headers, rows };
+    } catch (err) {
+        console.warn("Lexicon API unavailable, loading the sheet directly:", err);
+        lexiconVersion = null;
+        return parseCSV(await loadCSV(CSV_URL));
+    }
+}
+
 async function loadAndRender() {
     showSkeleton();
     try {
-        const csvText = await loadCSV(CSV_URL);
-        const { headers, rows } = parseCSV(csvText);
+        const { headers, rows } = await loadLexicon();
         fullData = rows;
         
         // Initial Render
@@ -70,12 +94,43 @@ async function loadAndRender() {
     }
 }
 
+/**
+ * Applies changelog entries from /api/lexicon/changes to fullData in place.
+ */
+function applyLexiconChanges(changes) {
+    changes.forEach(entry => {
+        entry.deleted.forEach(({ key }) => {
+            const row = rowsByKey.get(key);
+            if (row) fullData.splice(fullData.indexOf(row), 1);
+            rowsByKey.delete(key);
+        });
+        entry.updated.forEach(({ key, row }) => {
+            const old = rowsByKey.get(key);
+            if (old) fullData[fullData.indexOf(old)] = row;
+            else fullData.push(row);
+            rowsByKey.set(key, row);
+        });
+        entry.added.forEach(({ key, row }) => {
+            fullData.push(row);
+            rowsByKey.set(key, row);
+        });
+    });
+}
+
 async function refreshCSV() {
     // Background refresh - doesn't show skeleton to avoid flickering
     try {
-        const csvText = await loadCSV(CSV_URL);
-        const { headers, rows } = parseCSV(csvText);
-        fullData = rows;
+        if (lexiconVersion === null) {
+            const { rows } = await loadLexicon();
+            fullData = rows;
+        } else {
+            // Only fetch rows changed since the version we hold
+            const response = await fetch(`${LEXICON_API}/changes?since=${lexiconVersion}`, { cache: "no-store" });
+            if (!response.ok) throw new Error("Lexicon changes error: " + response.status);
+            const data = await response.json();
+            applyLexiconChanges(data.changes);
+            lexiconVersion = data.version;
+        }
         
         // Re-apply filters to current data
         applyFilters(false); // false = don't reset page if possible